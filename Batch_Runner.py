@@ -0,0 +1,169 @@
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from Evaluation_Harness import MODEL_NAMES, build_models, percentile
+from Instrumentation import METRICS, profiled, enable_profiling, export_json, export_prometheus
+
+# Headless batch query runner for production replay and benchmarks.
+#
+# Queries are read one JSON object per line, {"qid": ..., "query": ...} (qid
+# defaults to the line number), and results are written one JSON object per
+# line, in input order:
+#   {"qid": ..., "model": ..., "latency_ms": ..., "results": [{"rank", "doc", "score"}, ...]}
+# A query the model rejects (e.g. an unknown @region) gets no results and an "error".
+#
+# Example:
+#   python Batch_Runner.py --model gvsm --queries queries.jsonl --output results.jsonl --workers 4
+#
+# --metrics-json/--metrics-prom export the stage timings (see Instrumentation);
+# process workers send theirs back with each result. --profile-slow-ms keeps a
+# cProfile dump of every query slower than the threshold.
+
+_retrieve = None  # the model of this worker process (or of the main process for thread pools)
+_report_metrics = False  # whether run_query returns this process's metrics, set in process workers
+
+def init_worker(data_dir, model, profile_threshold=None, profile_dir='profiles', report_metrics=False):
+    global _retrieve, _report_metrics
+    _report_metrics = report_metrics
+    if profile_threshold is not None:
+        enable_profiling(profile_threshold, profile_dir)
+    _retrieve = build_models(data_dir, [model])[model]
+
+def run_query(qid, query, depth):
+    """
+    Rank one query with this process's model; returns (qid, results, seconds, metrics, error),
+    where metrics are the worker's metrics since its last query (None in the main process)
+    and error is the message of a rejected query.
+    """
+    start = time.perf_counter()
+    error = None
+    with profiled('query'):
+        try:
+            results = _retrieve(query)[:depth]
+        except ValueError as e:
+            results, error = [], str(e)
+    seconds = time.perf_counter() - start
+    return qid, results, seconds, METRICS.drain() if _report_metrics else None, error
+
+def read_queries(lines):
+    """Yield (qid, query) from JSONL lines, skipping blank ones."""
+    for line_number, line in enumerate(lines, 1):
+        if line.strip():
+            record = json.loads(line)
+            yield str(record.get('qid', line_number)), record['query']
+
+def run_batch(queries, output, model, data_dir='data', workers=1, pool='thread', depth=100,
+              profile_threshold=None, profile_dir='profiles'):
+    """
+    Stream (qid, query) pairs through a worker pool, write JSONL results in input
+    order and return throughput and latency statistics.
+
+    With a process pool every worker builds its own copy of the model; with a
+    thread pool the model is built once and shared. Queries slower than
+    `profile_threshold` seconds are profiled into `profile_dir`.
+    """
+    start = time.perf_counter()
+    if pool == 'process':
+        executor = ProcessPoolExecutor(workers, initializer=init_worker,
+                                       initargs=(data_dir, model, profile_threshold, profile_dir, True))
+        build_seconds = 0.0
+    else:
+        init_worker(data_dir, model, profile_threshold, profile_dir)
+        executor = ThreadPoolExecutor(workers)
+        build_seconds = time.perf_counter() - start
+
+    latencies = []
+    query_seconds = METRICS.histogram('query_seconds', model=model)
+
+    def write(future):
+        qid, results, seconds, metrics, error = future.result()
+        if metrics is not None:
+            METRICS.merge(metrics)
+        latencies.append(seconds)
+        query_seconds.observe(seconds)
+        record = {
+            'qid': qid,
+            'model': model,
+            'latency_ms': round(seconds * 1000, 3),
+            'results': [{'rank': rank, 'doc': doc, 'score': score} for rank, (doc, score) in enumerate(results, 1)]
+        }
+        if error is not None:
+            record['error'] = error
+        output.write(json.dumps(record) + '\n')
+
+    # Keep a bounded number of queries in flight so memory does not grow with the input
+    run_start = time.perf_counter()
+    with executor:
+        pending = deque()
+        for qid, query in queries:
+            pending.append(executor.submit(run_query, qid, query, depth))
+            if len(pending) >= 2 * workers:
+                write(pending.popleft())
+        while pending:
+            write(pending.popleft())
+    wall_seconds = time.perf_counter() - run_start
+
+    return {
+        'model': model,
+        'workers': workers,
+        'pool': pool,
+        'queries': len(latencies),
+        'build_seconds': build_seconds,
+        'wall_seconds': wall_seconds,
+        'qps': len(latencies) / wall_seconds if wall_seconds else 0.0,
+        'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies, default=0.0) * 1000
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a JSONL file of queries through one retrieval model.")
+    parser.add_argument('--model', required=True, choices=MODEL_NAMES, help="retrieval model")
+    parser.add_argument('--queries', default='-', help="JSONL queries file (default: stdin)")
+    parser.add_argument('--output', default='-', help="JSONL results file (default: stdout)")
+    parser.add_argument('--data', default='data', help="document directory (default: data)")
+    parser.add_argument('--workers', type=int, default=1, help="worker pool size (default: 1)")
+    parser.add_argument('--pool', choices=('thread', 'process'), default='thread',
+                        help="thread pool sharing one model, or process pool with a model per worker (default: thread)")
+    parser.add_argument('--depth', type=int, default=100, help="results kept per query (default: 100)")
+    parser.add_argument('--stats', help="write throughput/latency statistics as JSON to this file")
+    parser.add_argument('--metrics-json', help="write stage timing metrics as JSON to this file")
+    parser.add_argument('--metrics-prom', help="write stage timing metrics in the Prometheus text format to this file")
+    parser.add_argument('--profile-slow-ms', type=float,
+                        help="save a cProfile dump of every query slower than this many milliseconds")
+    parser.add_argument('--profile-dir', default='profiles', help="directory for cProfile dumps (default: profiles)")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    queries_file = sys.stdin if args.queries == '-' else open(args.queries, 'r', encoding='utf-8')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        profile_threshold = args.profile_slow_ms / 1000 if args.profile_slow_ms is not None else None
+        stats = run_batch(read_queries(queries_file), output_file, args.model, args.data, args.workers, args.pool,
+                          args.depth, profile_threshold, args.profile_dir)
+    finally:
+        if queries_file is not sys.stdin:
+            queries_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    print(f"{stats['queries']} queries in {stats['wall_seconds']:.2f} s ({stats['qps']:.1f} q/s) with "
+          f"{stats['workers']} {stats['pool']} worker(s); latency p50 {stats['p50_ms']:.2f} ms, "
+          f"p95 {stats['p95_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms", file=sys.stderr)
+    if args.stats:
+        with open(args.stats, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+    if args.metrics_json:
+        export_json(args.metrics_json)
+    if args.metrics_prom:
+        export_prometheus(args.metrics_prom)
+    return stats
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+import math
+import numpy as np
+from Instrumentation import span
+
+# Binary Independence Model with Robertson/Sparck Jones term weights
+class BinaryIndependenceModel:
+    """
+    Binary Independence Model over a term -> documents postings index.
+
+    Document frequencies are taken once from the postings, so the default
+    (no relevance information) weight of every term is precomputed:
+
+        w(t) = log((N - n_t + 0.5) / (n_t + 0.5))
+
+    Given a set of R documents judged relevant, of which r_t contain t, the
+    weights are re-estimated with the RSJ formula:
+
+        w(t) = log(((r_t + 0.5) / (R - r_t + 0.5)) / ((n_t - r_t + 0.5) / (N - n_t - R + r_t + 0.5)))
+
+    A document's score is the sum of the weights of the query terms it contains.
+    Postings are kept as sorted arrays of document IDs, so scoring concatenates
+    the query terms' postings and sums the weights per document with bincount.
+    """
+    def __init__(self, postings, num_documents):
+        self.doc_ids = sorted(set().union(*postings.values()))
+        self.doc_index = {doc: i for i, doc in enumerate(self.doc_ids)}
+        self.postings = {
+            term: np.sort(np.fromiter((self.doc_index[doc] for doc in docs), dtype=np.int32, count=len(docs)))
+            for term, docs in postings.items()
+        }
+        self.num_documents = num_documents
+        self.doc_freqs = {term: len(docs) for term, docs in postings.items()}
+        self.term_weights = {term: self.rsj_weight(n_t) for term, n_t in self.doc_freqs.items()}
+
+    def rsj_weight(self, n_t, r_t=0, num_relevant=0):
+        N = self.num_documents
+        return math.log(
+            ((r_t + 0.5) / (num_relevant - r_t + 0.5)) /
+            ((n_t - r_t + 0.5) / (N - n_t - num_relevant + r_t + 0.5))
+        )
+
+    def query_weights(self, query_terms, relevant_docs=None):
+        """
+        Return {term: weight} for the query, re-estimated from relevant_docs if any are
+        given. Relevant documents missing from the index are ignored.
+        """
+        weights = {}
+        relevant_ids = np.unique(np.array([self.doc_index[doc] for doc in relevant_docs or () if doc in self.doc_index],
+                                          dtype=np.int32))
+        for term in set(query_terms):
+            if term not in self.postings:
+                continue
+            if len(relevant_ids):
+                r_t = int(np.isin(self.postings[term], relevant_ids, assume_unique=True).sum())
+                weights[term] = self.rsj_weight(self.doc_freqs[term], r_t, len(relevant_ids))
+            else:
+                weights[term] = self.term_weights[term]
+        return weights
+
+    def retrieve(self, query_terms, relevant_docs=None):
+        """Rank documents containing at least one query term by their summed RSJ weights."""
+        with span('score', model="Binary Independence Model"):
+            weights = self.query_weights(query_terms, relevant_docs)
+            if not weights:
+                return []
+            term_postings = [self.postings[term] for term in weights]
+            ids = np.concatenate(term_postings)
+            contributions = np.repeat(np.fromiter(weights.values(), dtype=np.float64, count=len(weights)),
+                                      [len(docs) for docs in term_postings])
+            matched, inverse = np.unique(ids, return_inverse=True)
+            scores = np.bincount(inverse, weights=contributions)
+        with span('top-k', model="Binary Independence Model"):
+            order = np.argsort(-scores, kind='stable')
+            return [(self.doc_ids[matched[i]], float(scores[i])) for i in order]
@@ -0,0 +1,127 @@
+import os
+import sys
+import mmap
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+
+# Lazy document content store
+class DocumentStore(Mapping):
+    """
+    Read-only {path: text} mapping over the documents of a directory.
+
+    Only the paths and file sizes are kept in memory. A document's text is read
+    on demand through mmap and kept in an LRU cache bounded by `max_bytes`, so
+    resident memory stays the same however large the corpus is. An optional
+    `transform` (e.g. noun extraction) is applied before the text is cached.
+    """
+    def __init__(self, directory, extensions=('.txt',), transform=None, max_bytes=64 * 1024 * 1024):
+        self.paths = []
+        self.sizes = array('q')
+        for root, _, files in os.walk(directory):
+            for file in files:
+                if file.endswith(extensions):
+                    file_path = os.path.join(root, file)
+                    self.paths.append(file_path)
+                    self.sizes.append(os.path.getsize(file_path))
+        self.doc_ids = {path: doc_id for doc_id, path in enumerate(self.paths)}
+        self.transform = transform
+        self.max_bytes = max_bytes
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __contains__(self, path):
+        return path in self.doc_ids
+
+    def read(self, path, limit=None):
+        """Read a document (or its first `limit` bytes) from disk, bypassing the cache."""
+        with open(path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return ''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = mapped[:limit] if limit else mapped[:]
+        # A prefix may end inside a multi-byte character
+        text = data.decode('utf-8', errors='ignore' if limit else 'strict')
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+
+    def __getitem__(self, path):
+        if path not in self.doc_ids:
+            raise KeyError(path)
+        with self.lock:
+            if path in self.cache:
+                self.cache.move_to_end(path)
+                return self.cache[path]
+        text = self.read(path)
+        if self.transform is not None:
+            text = self.transform(text)
+        with self.lock:
+            if path not in self.cache:
+                self.cache[path] = text
+                self.cached_bytes += sys.getsizeof(text)
+                while self.cached_bytes > self.max_bytes and len(self.cache) > 1:
+                    _, evicted = self.cache.popitem(last=False)
+                    self.cached_bytes -= sys.getsizeof(evicted)
+        return text
+
+    def snippet(self, path, length=200):
+        """Return the first `length` characters of a document, reading only its first bytes."""
+        with self.lock:
+            if path in self.cache:
+                return self.cache[path][:length]
+        if self.transform is not None:
+            return self[path][:length]
+        return self.read(path, 4 * length)[:length]  # UTF-8 uses at most 4 bytes per character
+
+# Paged access to large files
+class PagedDocument:
+    """
+    A memory-mapped text file split into pages of about `page_bytes`, cut at line ends.
+
+    Page boundaries are found lazily as pages are requested, so opening a file
+    costs the same whatever its size. A line longer than a page is cut at a
+    character boundary.
+    """
+    def __init__(self, path, page_bytes=64 * 1024):
+        self.page_bytes = page_bytes
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.offsets = array('q', [0])  # start of each page found so far; the last one may be self.size
+
+    def _find_pages(self, count):
+        """Extend self.offsets until it holds count + 1 boundaries or reaches the end of the file."""
+        while len(self.offsets) <= count and self.offsets[-1] < self.size:
+            end = self.offsets[-1] + self.page_bytes
+            if end >= self.size:
+                end = self.size
+            else:
+                newline = self.mapped.find(b'\n', end, end + self.page_bytes)
+                if newline >= 0:
+                    end = newline + 1
+                else:
+                    while self.mapped[end] & 0xC0 == 0x80:  # inside a UTF-8 sequence
+                        end -= 1
+            self.offsets.append(end)
+
+    def page(self, index):
+        """Return the text of a page, or None past the end of the file."""
+        if index < 0:
+            return None
+        self._find_pages(index + 1)
+        if index + 1 >= len(self.offsets):
+            return None
+        data = self.mapped[self.offsets[index]:self.offsets[index + 1]]
+        return data.decode('utf-8', errors='replace').replace('\r\n', '\n')
+
+    def close(self):
+        if self.mapped is not None:
+            self.mapped.close()
+        self.file.close()
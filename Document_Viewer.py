@@ -0,0 +1,128 @@
+import os
+import html
+from collections import deque
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QTextBrowser
+from PyQt5.QtGui import QTextCursor
+from Document_Store import PagedDocument
+
+# Document viewer that renders large files a page at a time
+class PagedDocumentViewer(QDialog):
+    """
+    Dialog showing a memory-mapped document through a sliding window of pages.
+
+    Only WINDOW_PAGES pages are in the text browser at any time. When the user
+    scrolls within a page step of either end, the next (or previous) page is
+    rendered and the page at the far end is dropped, so opening and scrolling
+    cost the same whatever the file size. Subclasses override render_page to
+    add markup such as hyperlinks.
+    """
+    WINDOW_PAGES = 4
+
+    def __init__(self, file_path):
+        super().__init__()
+        self.resize(800, 600)
+        self.document = None
+        self.updating = False
+
+        layout = QVBoxLayout()
+        self.content_display = QTextBrowser(self)
+        self.content_display.verticalScrollBar().valueChanged.connect(self.handle_scroll)
+        layout.addWidget(self.content_display)
+        self.setLayout(layout)
+
+        self.open_document(file_path)
+
+    def open_document(self, file_path):
+        """Show the first pages of a file, replacing the current document."""
+        self.close_document()
+        self.file_path = file_path
+        self.setWindowTitle(os.path.basename(file_path))
+        self.content_display.clear()
+        self.first_page = 0
+        self.page_lengths = deque()  # characters each rendered page occupies in the text browser
+        try:
+            self.document = PagedDocument(file_path)
+        except Exception as e:
+            self.content_display.setText(f"Could not open file: {str(e)}")
+            return
+        self.updating = True
+        while len(self.page_lengths) < self.WINDOW_PAGES and self.append_page():
+            pass
+        self.updating = False
+        self.content_display.moveCursor(QTextCursor.Start)
+
+    def close_document(self):
+        if self.document is not None:
+            self.document.close()
+            self.document = None
+
+    def render_page(self, text):
+        """Return the HTML for one page of text."""
+        return html.escape(text).replace('\n', '<br>')
+
+    def insert_page(self, index, at_end):
+        text = self.document.page(index)
+        if text is None:
+            return None
+        content = self.content_display.document()
+        cursor = QTextCursor(content)
+        cursor.movePosition(QTextCursor.End if at_end else QTextCursor.Start)
+        before = content.characterCount()
+        cursor.insertHtml(self.render_page(text))
+        return content.characterCount() - before
+
+    def append_page(self):
+        length = self.insert_page(self.first_page + len(self.page_lengths), at_end=True)
+        if length is None:
+            return False
+        self.page_lengths.append(length)
+        return True
+
+    def prepend_page(self):
+        if self.first_page == 0:
+            return False
+        length = self.insert_page(self.first_page - 1, at_end=False)
+        if length is None:
+            return False
+        self.first_page -= 1
+        self.page_lengths.appendleft(length)
+        return True
+
+    def remove_page(self, from_end):
+        content = self.content_display.document()
+        cursor = QTextCursor(content)
+        if from_end:
+            length = self.page_lengths.pop()
+            cursor.movePosition(QTextCursor.End)
+            cursor.movePosition(QTextCursor.Left, QTextCursor.KeepAnchor, length)
+        else:
+            length = self.page_lengths.popleft()
+            cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor, length)
+            self.first_page += 1
+        cursor.removeSelectedText()
+
+    def handle_scroll(self, value):
+        """Slide the window of rendered pages when the user nears either end."""
+        if self.updating or self.document is None:
+            return
+        scroll_bar = self.content_display.verticalScrollBar()
+        margin = scroll_bar.pageStep()
+        self.updating = True
+        try:
+            if value >= scroll_bar.maximum() - margin and self.append_page():
+                if len(self.page_lengths) > self.WINDOW_PAGES:
+                    maximum = scroll_bar.maximum()
+                    self.remove_page(from_end=False)
+                    scroll_bar.setValue(value - (maximum - scroll_bar.maximum()))
+            elif value <= margin and self.first_page > 0:
+                maximum = scroll_bar.maximum()
+                self.prepend_page()
+                scroll_bar.setValue(value + (scroll_bar.maximum() - maximum))
+                if len(self.page_lengths) > self.WINDOW_PAGES:
+                    self.remove_page(from_end=True)
+        finally:
+            self.updating = False
+
+    def done(self, result):
+        self.close_document()
+        super().done(result)
@@ -0,0 +1,222 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import argparse
+import importlib
+
+# Headless offline evaluation of the retrieval models with TREC-style topics and qrels.
+#
+# Topics are either "qid<TAB>query" lines or TREC <top> blocks (the <title> is
+# used as the query). Qrels are "qid iteration docid relevance" lines. Document
+# IDs are paths relative to the data directory, with '/' as the separator.
+#
+# Example:
+#   python Evaluation_Harness.py --topics topics.tsv --qrels qrels.txt --runs runs
+
+MODEL_NAMES = (
+    'tfidf', 'gvsm', 'boolean', 'pnorm', 'fuzzy', 'bim', 'jaccard', 'nonoverlapped', 'proximal', 'structured',
+    'inference', 'lsa', 'spreading', 'expansion'
+)
+
+# Topics and relevance judgments
+def load_topics(path):
+    """Return [(qid, query), ...] from a tab-separated or TREC-format topics file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if '<top>' in text:
+        topics = []
+        for block in re.findall(r'<top>(.*?)</top>', text, re.S):
+            num = re.search(r'<num>\s*(?:Number:)?\s*(\S+)', block)
+            title = re.search(r'<title>\s*(?:Topic:)?\s*(.*?)\s*(?:<|$)', block, re.S)
+            if num and title:
+                topics.append((num.group(1), ' '.join(title.group(1).split())))
+        return topics
+    topics = []
+    for line in text.splitlines():
+        if line.strip() and not line.startswith('#'):
+            qid, _, query = line.partition('\t')
+            topics.append((qid.strip(), query.strip()))
+    return topics
+
+def load_qrels(path):
+    """Return {qid: {docid: relevance}} from a TREC qrels file."""
+    qrels = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 4:
+                qrels.setdefault(parts[0], {})[parts[2]] = int(parts[3])
+    return qrels
+
+# Effectiveness metrics
+def average_precision(ranking, judgments):
+    num_relevant = sum(1 for rel in judgments.values() if rel > 0)
+    if not num_relevant:
+        return 0.0
+    hits = 0
+    total = 0.0
+    for rank, doc in enumerate(ranking, 1):
+        if judgments.get(doc, 0) > 0:
+            hits += 1
+            total += hits / rank
+    return total / num_relevant
+
+def precision_at_k(ranking, judgments, k):
+    return sum(1 for doc in ranking[:k] if judgments.get(doc, 0) > 0) / k
+
+def ndcg_at_k(ranking, judgments, k):
+    dcg = sum(judgments.get(doc, 0) / math.log2(rank + 1) for rank, doc in enumerate(ranking[:k], 1))
+    ideal = sorted((rel for rel in judgments.values() if rel > 0), reverse=True)[:k]
+    idcg = sum(rel / math.log2(rank + 1) for rank, rel in enumerate(ideal, 1))
+    return dcg / idcg if idcg else 0.0
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+# Retrieval models, each wrapped as query -> [(doc path, score), ...]
+def build_models(data_dir, names):
+    models = {}
+    if 'tfidf' in names:
+        tf_idf = importlib.import_module('TF_IDF_Engine')
+        models['tfidf'] = tf_idf.TfIdfEngine(tf_idf.load_documents(data_dir)).search
+
+    set_theoretic_models = {
+        'gvsm': "Generalized Vector Model", 'boolean': "Boolean Model",
+        'pnorm': "Extended Boolean Model (p-norm)", 'fuzzy': "Fuzzy Set Model"
+    }
+    if set(set_theoretic_models) & set(names):
+        set_theoretic = importlib.import_module('Set_Theoretic_Engine')
+        engine = set_theoretic.SetTheoreticEngine(data_dir)
+        engine.prepare(model for name, model in set_theoretic_models.items() if name in names)  # not in query latency
+        for name, model in set_theoretic_models.items():
+            models[name] = lambda query, model=model, engine=engine: engine.rank(query, model)
+
+    structural_models = {
+        'bim': "Binary Independence Model", 'jaccard': "Jaccard Model", 'nonoverlapped': "Non-Overlapped List Model",
+        'proximal': "Proximal Nodes Model", 'structured': "Structured Region Model"
+    }
+    if set(structural_models) & set(names):
+        structural = importlib.import_module('Structural_Engine')
+        engine = structural.StructuralEngine(data_dir)
+        engine.prepare(model for name, model in structural_models.items() if name in names)  # not in query latency
+        for name, model in structural_models.items():
+            models[name] = lambda query, model=model, engine=engine: engine.rank(query, model)
+
+    if 'inference' in names:
+        inference = importlib.import_module('Inference_Network')
+        network = inference.InferenceNetwork(
+            inference.load_documents(data_dir), lambda text: re.findall(r'\w+', text.lower()))
+        models['inference'] = network.rank
+
+    if {'lsa', 'spreading', 'expansion'} & set(names):
+        neural = importlib.import_module('Neural_Network_Engine')
+        documents = neural.load_documents(data_dir)
+        if 'lsa' in names:
+            lsa = neural.LSAIndex(documents)  # vectors in a temporary file of its own
+            models['lsa'] = lambda query: lsa.search(query, top_k=1000)
+        if 'spreading' in names:
+            network = neural.SpreadingActivationNetwork(documents)
+            models['spreading'] = lambda query: network.search([query], top_k=1000)[0]
+        if 'expansion' in names:
+            expansion = neural.ExpansionIndex(documents, lambda text: re.findall(r'\w+', text.lower()))
+            models['expansion'] = expansion.search
+
+    return {name: models[name] for name in names}
+
+# Evaluation loop
+def evaluate_model(name, retrieve, topics, qrels, data_dir, depth, k, run_file=None):
+    """
+    Run every topic through one model and return its effectiveness and latency summary.
+    A topic the model rejects (ValueError, e.g. an unknown @region) is logged and scored
+    as an empty ranking.
+    """
+    latencies = []
+    rejected = 0
+    metrics = {'map': [], f'ndcg@{k}': [], f'p@{k}': []}
+    for qid, query in topics:
+        start = time.perf_counter()
+        try:
+            results = retrieve(query)[:depth]
+        except ValueError as e:
+            print(f"{name}: topic {qid} rejected: {e}", file=sys.stderr)
+            results = []
+            rejected += 1
+        latencies.append(time.perf_counter() - start)
+
+        ranking = [os.path.relpath(doc, data_dir).replace(os.sep, '/') for doc, _ in results]
+        if run_file is not None:
+            for rank, (doc, (_, score)) in enumerate(zip(ranking, results), 1):
+                run_file.write(f"{qid} Q0 {doc} {rank} {score:.6f} {name}\n")
+        if qid in qrels:
+            judgments = qrels[qid]
+            metrics['map'].append(average_precision(ranking, judgments))
+            metrics[f'ndcg@{k}'].append(ndcg_at_k(ranking, judgments, k))
+            metrics[f'p@{k}'].append(precision_at_k(ranking, judgments, k))
+
+    total_time = sum(latencies)
+    summary = {metric: sum(values) / len(values) if values else 0.0 for metric, values in metrics.items()}
+    summary.update({
+        'queries': len(latencies),
+        'rejected': rejected,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'qps': len(latencies) / total_time if total_time else 0.0
+    })
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the retrieval models against TREC-style topics and qrels.")
+    parser.add_argument('--data', default='data', help="document directory (default: data)")
+    parser.add_argument('--topics', required=True, help="topics file (qid<TAB>query or TREC <top> format)")
+    parser.add_argument('--qrels', required=True, help="TREC qrels file")
+    parser.add_argument('--models', default=','.join(MODEL_NAMES), help="comma-separated subset of " + ', '.join(MODEL_NAMES))
+    parser.add_argument('--depth', type=int, default=1000, help="results kept per query (default: 1000)")
+    parser.add_argument('--k', type=int, default=10, help="cutoff for P@k and nDCG@k (default: 10)")
+    parser.add_argument('--runs', help="directory to write one TREC run file per model")
+    parser.add_argument('--report', help="write the summary as JSON to this file")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.models.split(',') if name.strip()]
+    unknown = [name for name in names if name not in MODEL_NAMES]
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(unknown)}")
+
+    topics = load_topics(args.topics)
+    qrels = load_qrels(args.qrels)
+    print(f"Loaded {len(topics)} topics and judgments for {len(qrels)} of them.")
+
+    start = time.perf_counter()
+    models = build_models(args.data, names)
+    print(f"Built {len(models)} model(s) in {time.perf_counter() - start:.2f} seconds.")
+    if args.runs:
+        os.makedirs(args.runs, exist_ok=True)
+
+    report = {}
+    for name, retrieve in models.items():
+        if args.runs:
+            with open(os.path.join(args.runs, f"{name}.run"), 'w', encoding='utf-8') as run_file:
+                report[name] = evaluate_model(name, retrieve, topics, qrels, args.data, args.depth, args.k, run_file)
+        else:
+            report[name] = evaluate_model(name, retrieve, topics, qrels, args.data, args.depth, args.k)
+
+    k = args.k
+    print(f"\n{'model':<10} {'MAP':>7} {f'nDCG@{k}':>8} {f'P@{k}':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'q/s':>9}")
+    for name, summary in report.items():
+        print(f"{name:<10} {summary['map']:7.4f} {summary[f'ndcg@{k}']:8.4f} {summary[f'p@{k}']:7.4f} "
+              f"{summary['p50_ms']:9.2f} {summary['p95_ms']:9.2f} {summary['p99_ms']:9.2f} {summary['qps']:9.1f}")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -9,12 +9,18 @@ from queue import Queue
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from pathlib import Path
+from Link_Analysis import compute_link_priors
+from Instrumentation import Counter, span, export_prometheus
 
 # Define paths and constants
 CONTENT_INDEX_FILE = "content_index2.pkl"
 FILENAME_INDEX_FILE = "filename_index2.pkl"
+LINK_INDEX_FILE = "link_index2.pkl"
+LINK_PRIORS_FILE = "link_priors2.pkl"
+METRICS_FILE = "indexing_metrics.prom"
 TESTDATA_DIR = "data"
 REFRESH_INTERVAL = 5  # Check interval in seconds for changes
+INDEX_LOCK = threading.Lock()  # guards merges into the shared content index
 
 # Load and Save Index Functions
 def load_index(file_path):
@@ -23,7 +29,7 @@ def load_index(file_path):
             return pickle.load(f)
     return {}
 def save_index(index, file_path):
-    with open(file_path, 'wb') as f:
+    with span('persist'), open(file_path, 'wb') as f:
         pickle.dump(index, f)
 
 def index_file_content(filename, content_index, snippet_radius=5):
@@ -148,9 +154,80 @@ def index_file_content(filename, content_index, snippet_radius=5):
     except Exception as e:
         print(f"An error occurred while indexing the file '{filename}': {str(e)}")
 
+def merge_content_index(content_index, file_index):
+    """Merge one file's letter -> word -> {filename: snippets} index into the shared index."""
+    for letter, words in file_index.items():
+        target_words = content_index.setdefault(letter, {})
+        for word, files in words.items():
+            target_files = target_words.setdefault(word, {})
+            for filename, snippets in files.items():
+                target_files.setdefault(filename, set()).update(snippets)
+
+def index_file(file_path, content_index):
+    """Index a file into a private index, then merge it into the shared one under INDEX_LOCK."""
+    file_index = {}
+    with span('extract'):
+        index_file_content(file_path, file_index)
+    with span('index-merge'), INDEX_LOCK:
+        merge_content_index(content_index, file_index)
+
+# Precompute hypertext links between documents
+def read_document_words(filename):
+    """The lowercased words of a document as the hypertext viewer renders it; empty if it is not text."""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return {word.lower() for word in re.findall(r'\w+', f.read())}
+    except (OSError, UnicodeDecodeError):
+        return set()
+
+def build_link_index(content_index, read_words=None):
+    """
+    Derive the document links used by the hypertext viewer from the content index.
+
+    A term links to another document when it occurs in exactly one document
+    besides the one being displayed. Terms indexed in exactly two documents are
+    stored per document as term -> target doc ID; terms indexed in a single
+    document link to that document from every other one. When read_words
+    (filename -> set of words) is given, each document is read once to record
+    in 'unique_links' which of those links it actually shows, as
+    {doc ID: {target doc ID: number of terms}}, for the link analysis graph.
+    """
+    documents = sorted({filename for words in content_index.values() for files in words.values() for filename in files})
+    doc_ids = {filename: doc_id for doc_id, filename in enumerate(documents)}
+    links = {}
+    unique_terms = {}
+    for words in content_index.values():
+        for word, files in words.items():
+            if len(files) == 1:
+                unique_terms[word] = doc_ids[next(iter(files))]
+            elif len(files) == 2:
+                first, second = (doc_ids[filename] for filename in files)
+                links.setdefault(first, {})[word] = second
+                links.setdefault(second, {})[word] = first
+
+    unique_links = {}
+    for doc_id, filename in enumerate(documents if read_words is not None else ()):
+        shared = links.get(doc_id, {})
+        targets = {}
+        for word in read_words(filename):
+            target = unique_terms.get(word)
+            if target is not None and target != doc_id and word not in shared:
+                targets[target] = targets.get(target, 0) + 1
+        if targets:
+            unique_links[doc_id] = targets
+    return {'documents': documents, 'links': links, 'unique_terms': unique_terms, 'unique_links': unique_links}
+
+def save_link_indexes(content_index):
+    """Save the link index and its PageRank/HITS priors, warm-started from the previous priors."""
+    link_index = build_link_index(content_index, read_document_words)
+    save_index(link_index, LINK_INDEX_FILE)
+    save_index(compute_link_priors(link_index, load_index(LINK_PRIORS_FILE)), LINK_PRIORS_FILE)
+
 # Index filenames in testData directory
 def index_filenames(test_data_dir, filename_index):
-    for root, _, files in os.walk(test_data_dir):
+    with span('crawl'):
+        walk = list(os.walk(test_data_dir))
+    for root, _, files in walk:
         for filename in files:
             file_path = os.path.join(root, filename)
             filename_lower = filename.lower()
@@ -200,29 +277,30 @@ def perform_initial_indexing(content_index, filename_index, num_threads=4):
 
     # Queue setup for multithreaded subdirectory processing
     queue = Queue()
-    for root, dirs, _ in os.walk(TESTDATA_DIR):
+    with span('crawl'):
+        walk = list(os.walk(TESTDATA_DIR))
+    for root, dirs, _ in walk:
         for subdir in dirs:
             queue.put(os.path.join(root, subdir))
 
     # Calculate total files for progress tracking
-    total_files = sum(len(files) for _, _, files in os.walk(TESTDATA_DIR))
-    processed_files = [0]
+    total_files = sum(len(files) for _, _, files in walk)
+    processed_files = Counter()
 
     # Start threads for indexing
     threads = []
     for _ in range(num_threads):
-        thread = threading.Thread(target=index_subdir, args=(queue, content_index, filename_index, total_files, processed_files))
+        thread = threading.Thread(target=index_subdir, args=(queue, content_index, total_files, processed_files))
         thread.start()
         threads.append(thread)
 
     # Main thread handles files in the root directory of TESTDATA_DIR
     index_filenames(TESTDATA_DIR, filename_index)
-    for root, _, files in os.walk(TESTDATA_DIR):
+    for root, _, files in walk:
         for filename in files:
             file_path = os.path.join(root, filename)
-            index_file_content(file_path, content_index)
-            processed_files[0] += 1
-            show_progress(processed_files[0], total_files)
+            index_file(file_path, content_index)
+            show_progress(processed_files.inc(), total_files)
 
     # Wait for threads to complete
     for thread in threads:
@@ -231,18 +309,19 @@ def perform_initial_indexing(content_index, filename_index, num_threads=4):
     # Save updated indexes
     save_index(content_index, CONTENT_INDEX_FILE)
     save_index(filename_index, FILENAME_INDEX_FILE)
+    save_link_indexes(content_index)
+    export_prometheus(METRICS_FILE)
     print("\nInitial indexing complete.")
 
 # Threaded indexing function for subdirectory indexing
-def index_subdir(queue, content_index, filename_index, total_files, processed_files):
+def index_subdir(queue, content_index, total_files, processed_files):
     while not queue.empty():
         subdir = queue.get()
         for root, _, files in os.walk(subdir):
             for filename in files:
                 file_path = os.path.join(root, filename)
-                index_file_content(file_path, content_index)
-                processed_files[0] += 1
-                show_progress(processed_files[0], total_files)
+                index_file(file_path, content_index)
+                show_progress(processed_files.inc(), total_files)
         queue.task_done()
 
 # Show progress percentage for indexing
@@ -400,14 +479,18 @@ def update_modified_files(content_index, filename_index):
     for file_path in modified_files:
         filename_lower = os.path.basename(file_path).lower()
 
-        # Remove old entries from both indexes
-        content_index = {k: [entry for entry in v if entry[0] != file_path] for k, v in content_index.items()}
+        # Remove old entries from both indexes (content_index is letter -> word -> {filename: snippets})
+        for words in content_index.values():
+            for word in [word for word, files in words.items() if file_path in files]:
+                del words[word][file_path]
+                if not words[word]:
+                    del words[word]
         if filename_lower in filename_index:
             filename_index[filename_lower] = [entry for entry in filename_index[filename_lower] if entry[0] != file_path]
 
         # If the file exists, re-index it
         if os.path.exists(file_path):
-            index_file_content(file_path, content_index)
+            index_file(file_path, content_index)
             last_modified = os.path.getmtime(file_path)
             if filename_lower not in filename_index:
                 filename_index[filename_lower] = []
@@ -418,6 +501,8 @@ def update_modified_files(content_index, filename_index):
     # Save the updated indexes
     save_index(content_index, CONTENT_INDEX_FILE)
     save_index(filename_index, FILENAME_INDEX_FILE)
+    save_link_indexes(content_index)
+    export_prometheus(METRICS_FILE)
     print("Updated indexes for modified files.")
 
 # Main Program Entry Point
@@ -430,6 +515,9 @@ if __name__ == "__main__":
         perform_initial_indexing(content_index, filename_index)
     elif  needs_reindexing(filename_index):
         update_modified_files(content_index, filename_index)
+    elif not os.path.exists(LINK_INDEX_FILE) or not os.path.exists(LINK_PRIORS_FILE):
+        # Indexes from before link precomputation: build the links the hypertext viewer loads
+        save_link_indexes(content_index)
 
     # Start background file monitoring thread
     threading.Thread(target=start_file_monitoring, args=(content_index, filename_index), daemon=True).start()
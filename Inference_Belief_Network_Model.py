@@ -1,7 +1,11 @@
+import os
+import re
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QSplitter, QLineEdit, QTextBrowser, QWidget, QPushButton, QLabel, QComboBox, QDialog, QTextEdit
 )
 from PyQt5.QtCore import Qt
+from Document_Viewer import PagedDocumentViewer
+from Inference_Network import InferenceNetwork, load_documents
 
 class DocumentViewer(QDialog):
     def __init__(self, title, content):
@@ -46,6 +50,9 @@ class ProbabilisticIRApp(QMainWindow):
             "doc20": "Science fiction often explores futuristic themes, advanced technologies, and imaginative worlds."
         }
 
+        # The inference network searches the data corpus when there is one
+        self.corpus = load_documents('data') or self.documents
+
         self.queries = [
             "cat",
             "dog",
@@ -88,7 +95,7 @@ class ProbabilisticIRApp(QMainWindow):
         self.search_bar.setPlaceholderText("Enter query, e.g., 'cat'")
         self.search_button = QPushButton("Search")
         self.model_selector = QComboBox()
-        self.model_selector.addItems(["Interference Model", "Belief Network"])
+        self.model_selector.addItems(["Interference Model", "Belief Network", "Inference Network"])
         self.search_button.clicked.connect(self.perform_search)
         search_layout.addWidget(QLabel("Query:"))
         search_layout.addWidget(self.search_bar)
@@ -115,10 +122,11 @@ class ProbabilisticIRApp(QMainWindow):
 
         # Calculate Probabilities for Models
         self.calculate_probabilities()
+        self.inference_network = InferenceNetwork(self.corpus, self.tokenize)
 
     def tokenize(self, text):
         """Simple tokenizer."""
-        return text.lower().split()
+        return re.findall(r'\w+', text.lower())
 
     def calculate_probabilities(self):
         """Calculate probabilities for the Interference Model."""
@@ -127,9 +135,10 @@ class ProbabilisticIRApp(QMainWindow):
             query_count = sum(1 for (q, d), rel in self.relevance.items() if q == query and rel == 1)
             self.query_prob[query] = query_count / total_docs
 
-        for doc_id, content in self.documents.items():
-            doc_tokens = self.tokenize(content)
-            self.doc_prob[doc_id] = len(doc_tokens) / sum(len(self.tokenize(d)) for d in self.documents.values())
+        doc_lengths = {doc_id: len(self.tokenize(content)) for doc_id, content in self.documents.items()}
+        total_tokens = sum(doc_lengths.values())
+        for doc_id, doc_length in doc_lengths.items():
+            self.doc_prob[doc_id] = doc_length / total_tokens
 
         for (query, doc_id), rel in self.relevance.items():
             if rel == 1:
@@ -154,11 +163,23 @@ class ProbabilisticIRApp(QMainWindow):
     def perform_search(self):
         """Perform a search and display results."""
         query = self.search_bar.text()
+        model = self.model_selector.currentText()
+        if model == "Inference Network":
+            if not query:
+                self.results_browser.setText("Please enter a query, e.g. '#and(cat #or(sunlight mat))'.")
+                return
+            try:
+                ranked_results = self.inference_network.rank(query)
+            except ValueError as e:
+                self.results_browser.setText(f"Invalid query: {e}")
+                return
+            self.show_results(query, model, ranked_results, self.corpus)
+            return
+
         if not query or query not in self.queries:
             self.results_browser.setText("Invalid or empty query. Try 'cat', 'dog', or other predefined queries.")
             return
 
-        model = self.model_selector.currentText()
         if model == "Interference Model":
             ranked_results = self.interference_model_rank(query)
         elif model == "Belief Network":
@@ -167,9 +188,12 @@ class ProbabilisticIRApp(QMainWindow):
             self.results_browser.setText("Invalid model selected.")
             return
 
+        self.show_results(query, model, ranked_results, self.documents)
+
+    def show_results(self, query, model, ranked_results, documents):
         results_html = f"<b>Search Results for '{query}' using {model}:</b><br><br>"
         for doc_id, score in ranked_results:
-            snippet = self.documents[doc_id][:100] + '...'
+            snippet = documents[doc_id][:100] + '...'
             results_html += f"<a href='{doc_id}'><b>{doc_id}</b></a> (Score: {score:.4f})<br>{snippet}<br><br>"
 
         self.results_browser.setHtml(results_html)
@@ -177,9 +201,15 @@ class ProbabilisticIRApp(QMainWindow):
     def show_document(self, url):
         """Show the full content of the clicked document."""
         doc_id = url.toString().replace("%5C", '\\')
-        if doc_id in self.documents:
-            viewer = DocumentViewer(doc_id, self.documents[doc_id])
+        if doc_id in self.corpus and os.path.isfile(doc_id):
+            viewer = PagedDocumentViewer(doc_id)  # large files are rendered a page at a time
             viewer.exec_()
+            return
+        for documents in (self.documents, self.corpus):
+            if doc_id in documents:
+                viewer = DocumentViewer(doc_id, documents[doc_id])
+                viewer.exec_()
+                return
 
 if __name__ == "__main__":
     app = QApplication([])
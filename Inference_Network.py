@@ -0,0 +1,179 @@
+import os
+import re
+import math
+import heapq
+from array import array
+from Instrumentation import span
+
+# Inference network retrieval (InQuery-style structured queries)
+class InferenceNetwork:
+    """
+    Document-at-a-time inference network over precomputed term beliefs.
+
+    Each term's postings hold the belief bel(t|d) = 0.4 + 0.6 * ntf * nidf for the
+    documents containing it; every other document gets DEFAULT_BELIEF. Queries
+    are parsed into an operator tree (#and, #or, #not, #sum, #wsum, #max, with
+    bare terms combined by #sum) and evaluated one document at a time over the
+    union of the query terms' postings, advancing a cursor per term. A query
+    with #not can rank a document containing none of its terms above those
+    containing some, so then every other document is ranked too, at the belief
+    of a document outside all postings.
+    """
+    DEFAULT_BELIEF = 0.4
+    OPERATORS = ('#and', '#or', '#not', '#sum', '#wsum', '#max')
+
+    def __init__(self, documents, tokenize, doc_tokens=None):
+        """doc_tokens optionally supplies already tokenized documents, in the order of documents."""
+        self.tokenize = tokenize
+        self.doc_ids = list(documents)
+        term_freqs = {}
+        max_tfs = array('i')
+        if doc_tokens is None:
+            doc_tokens = map(tokenize, documents.values())
+        for doc_index, tokens in enumerate(doc_tokens):
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            max_tfs.append(max(counts.values(), default=0))
+            for term, tf in counts.items():
+                if term not in term_freqs:
+                    term_freqs[term] = (array('i'), array('i'))
+                term_freqs[term][0].append(doc_index)
+                term_freqs[term][1].append(tf)
+
+        num_docs = len(self.doc_ids)
+        self.postings = {}
+        for term, (doc_indices, tfs) in term_freqs.items():
+            nidf = math.log((num_docs + 0.5) / len(doc_indices)) / math.log(num_docs + 1.0)
+            beliefs = array('d')
+            for doc_index, tf in zip(doc_indices, tfs):
+                ntf = 0.4 + 0.6 * math.log(tf + 0.5) / math.log(max_tfs[doc_index] + 1.0)
+                beliefs.append(self.DEFAULT_BELIEF + (1 - self.DEFAULT_BELIEF) * ntf * nidf)
+            self.postings[term] = (doc_indices, beliefs)
+
+    def parse(self, query):
+        """
+        Parse a structured query into ('term', t) and (operator, children, weights) nodes.
+        #wsum takes weight/term pairs, e.g. '#wsum(2 cat 1 #or(dog bird))'. A word the
+        tokenizer splits, such as 'u.s.', becomes an #and of its tokens. Raises
+        ValueError for unknown operators.
+        """
+        tokens = re.findall(r'#\w+|\(|\)|[\w.]+', query.lower())
+        position = [0]
+
+        def at_close():
+            return position[0] >= len(tokens) or tokens[position[0]] == ')'
+
+        def parse_node():
+            token = tokens[position[0]]
+            position[0] += 1
+            if token.startswith('#') and token not in self.OPERATORS:
+                raise ValueError(f"unknown operator '{token}'; use one of {', '.join(self.OPERATORS)}")
+            if token not in self.OPERATORS:
+                terms = self.tokenize(token)
+                if len(terms) > 1:
+                    return ('#and', [('term', term) for term in terms], [1.0] * len(terms))
+                return ('term', terms[0] if terms else token)
+            children = []
+            weights = []
+            if position[0] < len(tokens) and tokens[position[0]] == '(':
+                position[0] += 1
+                while not at_close():
+                    if token == '#wsum':
+                        # Children alternate weight, node; weights are read before tokenizing
+                        weight = tokens[position[0]]
+                        if not re.fullmatch(r'\d+(\.\d*)?|\.\d+', weight):
+                            raise ValueError(f"#wsum expects a numeric weight before each node, got '{weight}'")
+                        position[0] += 1
+                        if at_close():
+                            raise ValueError(f"#wsum weight {weight} is not followed by a node")
+                        weights.append(float(weight))
+                    else:
+                        weights.append(1.0)
+                    children.append(parse_node())
+                position[0] += 1
+            return (token, children, weights)
+
+        nodes = []
+        while position[0] < len(tokens):
+            if tokens[position[0]] in ('(', ')'):
+                position[0] += 1
+                continue
+            nodes.append(parse_node())
+        if len(nodes) == 1:
+            return nodes[0]
+        return ('#sum', nodes, [1.0] * len(nodes))
+
+    def query_terms(self, node):
+        if node[0] == 'term':
+            return {node[1]}
+        return set().union(*(self.query_terms(child) for child in node[1]))
+
+    def negated(self, node):
+        if node[0] == 'term':
+            return False
+        return node[0] == '#not' or any(self.negated(child) for child in node[1])
+
+    def belief(self, node, doc_index, cursors):
+        """Belief of a query node for one document; term cursors only move forward."""
+        if node[0] == 'term':
+            postings = self.postings.get(node[1])
+            if postings is None:
+                return self.DEFAULT_BELIEF
+            doc_indices, beliefs = postings
+            i = cursors.get(node[1], 0)
+            while i < len(doc_indices) and doc_indices[i] < doc_index:
+                i += 1
+            cursors[node[1]] = i
+            if i < len(doc_indices) and doc_indices[i] == doc_index:
+                return beliefs[i]
+            return self.DEFAULT_BELIEF
+        operator, children, weights = node
+        values = [self.belief(child, doc_index, cursors) for child in children]
+        if not values:
+            return self.DEFAULT_BELIEF
+        if operator == '#and':
+            return math.prod(values)
+        if operator == '#or':
+            return 1.0 - math.prod(1.0 - value for value in values)
+        if operator == '#not':
+            return 1.0 - values[0]
+        if operator == '#max':
+            return max(values)
+        total_weight = sum(weights)
+        return sum(w * v for w, v in zip(weights, values)) / total_weight if total_weight else 0.0
+
+    def rank(self, query):
+        """
+        Rank the documents containing at least one query term by their belief in the
+        query, and under a #not every other document as well.
+        """
+        with span('query-parse', model="Inference Network"):
+            tree = self.parse(query)
+        with span('score', model="Inference Network"):
+            postings = [self.postings[term][0] for term in self.query_terms(tree) if term in self.postings]
+            cursors = {}
+            scores = []
+            last = None
+            for doc_index in heapq.merge(*postings):
+                if doc_index == last:
+                    continue
+                last = doc_index
+                scores.append((self.doc_ids[doc_index], self.belief(tree, doc_index, cursors)))
+            if self.negated(tree):
+                default = self.belief(tree, -1, {})  # no document is in any postings at -1
+                matched = set().union(*postings)
+                scores.extend((doc_id, default) for doc_index, doc_id in enumerate(self.doc_ids) if doc_index not in matched)
+        with span('top-k', model="Inference Network"):
+            return sorted(scores, key=lambda x: x[1], reverse=True)
+
+def load_documents(directory):
+    """Load .txt documents from a directory, keyed by path."""
+    documents = {}
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith('.txt'):
+                file_path = os.path.join(root, file)
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    documents[file_path] = f.read()
+    return documents
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import cProfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Lightweight stage timing, counters and histograms for indexing and search.
+#
+# Stages used across the repo: crawl, extract, tokenize, index-merge, persist,
+# query-parse, score, top-k and render. Metrics live in one process-wide
+# registry and can be exported as JSON or in the Prometheus text format:
+#
+#   with span('score', model='gvsm'):
+#       ...
+#   export_prometheus('metrics.prom')
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Counter:
+    """A thread-safe counter."""
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Add amount and return the new value."""
+        with self.lock:
+            self.value += amount
+            return self.value
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values (seconds for stage timings)."""
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def merge(self, counts, total):
+        """Add per-bucket counts and a sum recorded elsewhere (e.g. in another process)."""
+        with self.lock:
+            for i, count in enumerate(counts):
+                self.counts[i] += count
+                self.count += count
+            self.sum += total
+
+    def to_dict(self):
+        with self.lock:
+            cumulative = []
+            total = 0
+            for count in self.counts:
+                total += count
+                cumulative.append(total)
+            return {
+                'count': self.count,
+                'sum': self.sum,
+                'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], cumulative))
+            }
+
+class Metrics:
+    """Registry of named counters and histograms, each keyed by a sorted tuple of labels."""
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.counters:
+                self.counters[key] = Counter()
+            return self.counters[key]
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            return self.histograms[key]
+
+    def to_dict(self):
+        with self.lock:
+            counters = list(self.counters.items())
+            histograms = list(self.histograms.items())
+        return {
+            'counters': [{'name': name, 'labels': dict(labels), 'value': counter.value} for (name, labels), counter in counters],
+            'histograms': [{'name': name, 'labels': dict(labels), **histogram.to_dict()} for (name, labels), histogram in histograms]
+        }
+
+    def drain(self):
+        """
+        Return every metric recorded since the last drain and start again from zero,
+        as picklable ([(name, labels, value)], [(name, labels, bucket counts, sum)]).
+        Used to ship a worker process's metrics to its parent, see merge().
+        """
+        with self.lock:
+            counters, self.counters = self.counters, {}
+            histograms, self.histograms = self.histograms, {}
+        return (
+            [(name, labels, counter.value) for (name, labels), counter in counters.items()],
+            [(name, labels, histogram.counts, histogram.sum) for (name, labels), histogram in histograms.items()]
+        )
+
+    def merge(self, deltas):
+        """Add the output of another registry's drain() to this one."""
+        counters, histograms = deltas
+        for name, labels, value in counters:
+            self.counter(name, **dict(labels)).inc(value)
+        for name, labels, counts, total in histograms:
+            self.histogram(name, **dict(labels)).merge(counts, total)
+
+    def to_prometheus(self, prefix='ir_'):
+        """Render all metrics in the Prometheus text exposition format."""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                                  for key, value in pairs) + '}'
+
+        def metric_name(name):
+            return prefix + name.replace('-', '_')
+
+        data = self.to_dict()
+        lines = []
+        # Samples of one metric must be contiguous, under a single TYPE line
+        data['counters'].sort(key=lambda metric: metric['name'])
+        data['histograms'].sort(key=lambda metric: metric['name'])
+        declared = set()
+        for counter in data['counters']:
+            name = metric_name(counter['name']) + '_total'
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f"{name}{label_text(counter['labels'].items())} {counter['value']}")
+        for histogram in data['histograms']:
+            name = metric_name(histogram['name'])
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+            labels = histogram['labels'].items()
+            for bound, count in histogram['buckets'].items():
+                lines.append(f"{name}_bucket{label_text(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_sum{label_text(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{label_text(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+METRICS = Metrics()
+
+@contextmanager
+def span(stage, **labels):
+    """Time a block as one occurrence of a named stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.histogram('stage_seconds', stage=stage, **labels).observe(time.perf_counter() - start)
+
+def count(name, amount=1, **labels):
+    return METRICS.counter(name, **labels).inc(amount)
+
+def export_json(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(METRICS.to_dict(), f, indent=2)
+
+def export_prometheus(path):
+    """Write the metrics as a Prometheus text file (e.g. for the node exporter's textfile collector)."""
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(METRICS.to_prometheus())
+    os.replace(temporary, path)
+
+# Optional profiling of slow operations
+PROFILING = {'threshold': None, 'directory': 'profiles'}
+
+def enable_profiling(threshold_seconds=1.0, directory='profiles'):
+    """Profile every profiled() block and keep the cProfile output of those slower than the threshold."""
+    PROFILING['threshold'] = threshold_seconds
+    PROFILING['directory'] = directory
+
+@contextmanager
+def profiled(name):
+    """
+    Run a block under cProfile when profiling is enabled and save the stats to
+    <directory>/<name>-<timestamp>.prof if it took longer than the threshold.
+    """
+    threshold = PROFILING['threshold']
+    if threshold is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler is already active, e.g. in a concurrent query
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        if elapsed >= threshold:
+            os.makedirs(PROFILING['directory'], exist_ok=True)
+            safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+            profiler.dump_stats(os.path.join(PROFILING['directory'], f"{safe_name}-{time.time_ns()}.prof"))
+            count('slow_operations', stage=name)
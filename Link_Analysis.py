@@ -0,0 +1,141 @@
+import numpy as np
+
+# Static link-based document priors (PageRank and HITS) over the hypertext graph
+def build_adjacency(link_index):
+    """
+    Return the document link graph of a link index (see Indexer_Model.build_link_index)
+    as CSR arrays (indptr, indices, data), where data counts the terms linking two documents.
+
+    Both kinds of link the hypertext viewer renders are edges: terms shared by
+    exactly two documents ('links') and words of a document that are indexed
+    only in another one ('unique_links', counted per target).
+    """
+    num_docs = len(link_index['documents'])
+    rows, cols, weights = [], [], []
+    for source, targets in link_index['links'].items():
+        rows.extend([source] * len(targets))
+        cols.extend(targets.values())
+        weights.extend([1] * len(targets))
+    for source, targets in link_index.get('unique_links', {}).items():
+        rows.extend([source] * len(targets))
+        cols.extend(targets.keys())
+        weights.extend(targets.values())
+    rows = np.array(rows, dtype=np.int64)
+    cols = np.array(cols, dtype=np.int64)
+    keys, inverse = np.unique(rows * num_docs + cols, return_inverse=True)
+    data = np.bincount(inverse.ravel(), weights=weights, minlength=len(keys))
+    indptr = np.zeros(num_docs + 1, dtype=np.int64)
+    if num_docs:
+        np.cumsum(np.bincount(keys // num_docs, minlength=num_docs), out=indptr[1:])
+    return indptr, (keys % max(num_docs, 1)).astype(np.int32), data.astype(np.float64)
+
+def pagerank(indptr, indices, data, damping=0.85, tol=1e-8, max_iter=100, start=None):
+    """
+    PageRank by power iteration until the L1 change drops below tol.
+
+    Dangling documents spread their rank uniformly. `start` warm-starts the
+    iteration from a previous score vector.
+    """
+    num_docs = len(indptr) - 1
+    if not num_docs:
+        return np.zeros(0)
+    rows = np.repeat(np.arange(num_docs), np.diff(indptr))
+    out_weights = np.bincount(rows, weights=data, minlength=num_docs)
+    dangling = out_weights == 0
+    transition = data / np.where(dangling, 1.0, out_weights)[rows]
+    if start is None or not np.isfinite(start).all() or start.sum() <= 0:
+        rank = np.full(num_docs, 1.0 / num_docs)
+    else:
+        rank = start / start.sum()
+    for _ in range(max_iter):
+        spread = np.bincount(indices, weights=rank[rows] * transition, minlength=num_docs)
+        new_rank = damping * spread + (damping * rank[dangling].sum() + 1 - damping) / num_docs
+        converged = np.abs(new_rank - rank).sum() < tol
+        rank = new_rank
+        if converged:
+            break
+    return rank
+
+def unit_vector(vector):
+    """Scale a vector to unit L2 norm; an all-zero (or non-finite) vector becomes uniform."""
+    norm = np.linalg.norm(vector)
+    if not norm or not np.isfinite(norm):
+        return np.full(len(vector), 1.0 / np.sqrt(len(vector)))
+    return vector / norm
+
+def hits(indptr, indices, data, tol=1e-8, max_iter=100, start=None):
+    """
+    HITS authority and hub scores by power iteration until the L1 change drops below tol.
+
+    `start` warm-starts the iteration from previous hub scores. A warm start
+    whose hubs reach no document (e.g. every old link was removed) falls back
+    to uniform scores instead of dividing by a zero norm.
+    """
+    num_docs = len(indptr) - 1
+    if not num_docs or not len(indices):
+        return np.zeros(num_docs), np.zeros(num_docs)
+    rows = np.repeat(np.arange(num_docs), np.diff(indptr))
+    hub = unit_vector(np.ones(num_docs) if start is None else start)
+    for _ in range(max_iter):
+        authority = unit_vector(np.bincount(indices, weights=hub[rows] * data, minlength=num_docs))
+        new_hub = unit_vector(np.bincount(rows, weights=authority[indices] * data, minlength=num_docs))
+        converged = np.abs(new_hub - hub).sum() < tol
+        hub = new_hub
+        if converged:
+            break
+    return authority, hub
+
+def compute_link_priors(link_index, previous=None, damping=0.85, tol=1e-8):
+    """
+    Return {'documents', 'adjacency', 'pagerank', 'authority', 'hub'} for a link index.
+
+    Scores are arrays aligned with 'documents'. When the priors of an earlier
+    version of the index are given, their scores seed the power iterations, so
+    an incremental update converges in a few iterations.
+    """
+    documents = link_index['documents']
+    indptr, indices, data = build_adjacency(link_index)
+    pagerank_start = hub_start = None
+    if previous:
+        old_ids = {path: doc_id for doc_id, path in enumerate(previous['documents'])}
+        mapped = np.array([old_ids.get(path, -1) for path in documents], dtype=np.int64)
+        known = mapped >= 0
+        if known.any():
+            pagerank_start = np.full(len(documents), 1.0 / max(len(documents), 1))
+            pagerank_start[known] = previous['pagerank'][mapped[known]]
+            hub_start = np.zeros(len(documents))
+            hub_start[known] = previous['hub'][mapped[known]]
+            hub_start[~known] = hub_start[known].mean()
+    authority, hub = hits(indptr, indices, data, tol=tol, start=hub_start)
+    return {
+        'documents': documents,
+        'adjacency': (indptr, indices, data),
+        'pagerank': pagerank(indptr, indices, data, damping, tol, start=pagerank_start),
+        'authority': authority,
+        'hub': hub
+    }
+
+class LinkPriors:
+    """
+    Query-independent document priors loaded from compute_link_priors output.
+
+    Scores are rescaled to [0, 1] once at load time, so mixing them into a
+    ranking costs one dictionary lookup per result.
+    """
+    def __init__(self, priors, kind='pagerank'):
+        # Priors saved before unit_vector guarded HITS can hold NaN
+        scores = np.nan_to_num(priors[kind]) if len(priors['documents']) else np.zeros(0)
+        peak = scores.max() if len(scores) and scores.max() > 0 else 1.0
+        self.scores = {path: float(score / peak) for path, score in zip(priors['documents'], scores)}
+
+    def get(self, doc):
+        return self.scores.get(doc, 0.0)
+
+    def mix(self, results, weight=0.1):
+        """
+        Re-rank [(doc, score), ...] by (1 - weight) * score + weight * prior, with
+        scores first divided by the top score so both terms are on a [0, 1] scale.
+        """
+        top = max((abs(score) for _, score in results), default=0.0) or 1.0
+        mixed = [(doc, (1 - weight) * score / top + weight * self.get(doc)) for doc, score in results]
+        return sorted(mixed, key=lambda x: x[1], reverse=True)
@@ -1,8 +1,13 @@
-import math
+import os
+import re
+import time
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QSplitter, QLineEdit, QTextBrowser, QWidget, QPushButton, QLabel, QDialog, QTextEdit
+    QApplication, QMainWindow, QVBoxLayout, QSplitter, QLineEdit, QTextBrowser, QWidget, QPushButton, QLabel, QDialog, QTextEdit,
+    QComboBox, QSpinBox, QDoubleSpinBox
 )
 from PyQt5.QtCore import Qt
+from Document_Viewer import PagedDocumentViewer
+from Neural_Network_Engine import load_documents, LSAIndex, ExpansionIndex, SpreadingActivationNetwork
 
 class ArticleViewer(QDialog):
     def __init__(self, title, content):
@@ -39,6 +44,12 @@ class NeuralNetworkIRApp(QMainWindow):
             "health": ["wellness", "well-being", "fitness"]
         }
 
+        # Dense LSA embeddings over the data corpus when there is one
+        self.corpus = load_documents('data') or self.articles
+        self.lsa = LSAIndex(self.corpus)
+        self.expansion = ExpansionIndex(self.corpus, self.tokenize, self.vocabulary)
+        self.network = SpreadingActivationNetwork(self.corpus)
+
         # UI Elements
         splitter = QSplitter(Qt.Vertical)
 
@@ -49,8 +60,27 @@ class NeuralNetworkIRApp(QMainWindow):
         self.search_bar.setPlaceholderText("Enter your query, e.g., 'benefits of exercise for health'")
         self.search_button = QPushButton("Search")
         self.search_button.clicked.connect(self.perform_search)
+        self.model_selector = QComboBox(self)
+        self.model_selector.addItems(["Term Overlap", "Semantic Search (LSA)", "Spreading Activation"])
+        self.nprobe_input = QSpinBox(self)
+        self.nprobe_input.setRange(1, self.lsa.ann.n_lists)
+        self.nprobe_input.setValue(min(8, self.lsa.ann.n_lists))
+        self.iterations_input = QSpinBox(self)
+        self.iterations_input.setRange(0, 10)
+        self.iterations_input.setValue(2)
+        self.threshold_input = QDoubleSpinBox(self)
+        self.threshold_input.setRange(0.0, 1.0)
+        self.threshold_input.setSingleStep(0.05)
+        self.threshold_input.setValue(0.1)
         search_layout.addWidget(QLabel("Query:"))
         search_layout.addWidget(self.search_bar)
+        search_layout.addWidget(QLabel("Model:"))
+        search_layout.addWidget(self.model_selector)
+        search_layout.addWidget(QLabel("Clusters probed by semantic search (higher = better recall, slower):"))
+        search_layout.addWidget(self.nprobe_input)
+        search_layout.addWidget(QLabel("Spreading activation iterations and threshold:"))
+        search_layout.addWidget(self.iterations_input)
+        search_layout.addWidget(self.threshold_input)
         search_layout.addWidget(self.search_button)
         search_widget.setLayout(search_layout)
         splitter.addWidget(search_widget)
@@ -72,20 +102,7 @@ class NeuralNetworkIRApp(QMainWindow):
 
     def tokenize(self, text):
         """Simple tokenizer."""
-        return text.lower().split()
-
-    def semantic_expand(self, query_terms):
-        """Expand the query with related terms using predefined vocabulary."""
-        expanded_query = set(query_terms)
-        for term in query_terms:
-            if term in self.vocabulary:
-                expanded_query.update(self.vocabulary[term])
-        return expanded_query
-
-    def calculate_similarity(self, query_terms, document_terms):
-        """Calculate similarity between query and document based on term overlap."""
-        common_terms = set(query_terms) & set(document_terms)
-        return len(common_terms) / (math.sqrt(len(query_terms)) * math.sqrt(len(document_terms)))
+        return re.findall(r'\w+', text.lower())
 
     def perform_search(self):
         """Perform a search and display results."""
@@ -94,20 +111,15 @@ class NeuralNetworkIRApp(QMainWindow):
             self.results_browser.setText("Please enter a query.")
             return
 
-        # Tokenize and expand query
-        query_terms = self.tokenize(query)
-        expanded_query = self.semantic_expand(query_terms)
-
-        # Rank articles
-        scores = {}
-        for title, content in self.articles.items():
-            document_terms = self.tokenize(content)
-            similarity_score = self.calculate_similarity(expanded_query, document_terms)
-            if similarity_score > 0:
-                scores[title] = similarity_score
+        if self.model_selector.currentText() == "Semantic Search (LSA)":
+            self.semantic_search(query)
+            return
+        if self.model_selector.currentText() == "Spreading Activation":
+            self.spreading_activation_search(query)
+            return
 
-        # Sort results
-        ranked_results = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        # Rank documents by overlap with the expanded query
+        ranked_results = self.expansion.search(query)
 
         # Display results
         if not ranked_results:
@@ -116,17 +128,54 @@ class NeuralNetworkIRApp(QMainWindow):
 
         results_html = f"<b>Search Results for '{query}':</b><br><br>"
         for title, score in ranked_results:
-            snippet = self.articles[title][:100] + '...'
+            snippet = self.corpus[title][:100] + '...'
             results_html += f"<a href='{title}'><b>{title}</b></a> (Score: {score:.4f})<br>{snippet}<br><br>"
 
         self.results_browser.setHtml(results_html)
 
+    def semantic_search(self, query, top_k=20):
+        """Search the LSA embeddings through the approximate nearest-neighbor index."""
+        start_time = time.time()
+        ranked_results = self.lsa.search(query, top_k, self.nprobe_input.value())
+        elapsed_time = time.time() - start_time
+        if not ranked_results:
+            self.results_browser.setText("No relevant articles found for your query.")
+            return
+
+        results_html = f"<b>Semantic Search Results for '{query}':</b> ({elapsed_time * 1000:.2f} ms)<br><br>"
+        for title, score in ranked_results:
+            snippet = self.corpus[title][:100] + '...'
+            results_html += f"<a href='{title}'><b>{title}</b></a> (Score: {score:.4f})<br>{snippet}<br><br>"
+        self.results_browser.setHtml(results_html)
+
+    def spreading_activation_search(self, query, top_k=20):
+        """Rank documents by spreading activation through the term-document network."""
+        start_time = time.time()
+        ranked_results = self.network.search(
+            [query], self.iterations_input.value(), self.threshold_input.value(), top_k)[0]
+        elapsed_time = time.time() - start_time
+        if not ranked_results:
+            self.results_browser.setText("No relevant articles found for your query.")
+            return
+
+        results_html = f"<b>Spreading Activation Results for '{query}':</b> ({elapsed_time * 1000:.2f} ms)<br><br>"
+        for title, score in ranked_results:
+            snippet = self.corpus[title][:100] + '...'
+            results_html += f"<a href='{title}'><b>{title}</b></a> (Score: {score:.4f})<br>{snippet}<br><br>"
+        self.results_browser.setHtml(results_html)
+
     def show_article(self, url):
         """Show the full content of the clicked article."""
-        title = url.toString()
-        if title in self.articles:
-            viewer = ArticleViewer(title, self.articles[title])
+        title = url.toString().replace("%5C", '\\')
+        if title in self.corpus and os.path.isfile(title):
+            viewer = PagedDocumentViewer(title)  # large files are rendered a page at a time
             viewer.exec_()
+            return
+        for articles in (self.articles, self.corpus):
+            if title in articles:
+                viewer = ArticleViewer(title, articles[title])
+                viewer.exec_()
+                return
 
 if __name__ == "__main__":
     app = QApplication([])
@@ -0,0 +1,381 @@
+import os
+import re
+import math
+import tempfile
+import weakref
+import numpy as np
+from functools import lru_cache
+from Proximity_Graph import generate_proximal_nodes
+from Instrumentation import span
+
+# Load documents from a directory
+def load_documents(directory):
+    documents = {}
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith('.txt'):
+                file_path = os.path.join(root, file)
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    documents[file_path] = f.read()
+    return documents
+
+# Sparse matrix products for the randomized SVD and spreading activation
+class SparseMatrix:
+    """Compressed sparse row matrix supporting the products needed by randomized SVD and spreading activation."""
+    def __init__(self, indptr, indices, data, shape):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = shape
+
+    def dot(self, dense, block_nnz=65536):
+        """
+        Return self @ dense, processing at most block_nnz nonzeros at a time, so the
+        intermediate buffer stays at block_nnz x dense columns however the nonzeros
+        are spread over the rows. A row may be split across blocks.
+        """
+        out = np.zeros((self.shape[0], dense.shape[1]), dtype=np.float32)
+        for lo in range(0, int(self.indptr[-1]), block_nnz):
+            hi = min(lo + block_nnz, int(self.indptr[-1]))
+            contributions = self.data[lo:hi, None] * dense[self.indices[lo:hi]]
+            # Rows overlapping [lo, hi) and the part of each inside the block
+            first = np.searchsorted(self.indptr, lo, side='right') - 1
+            last = np.searchsorted(self.indptr, hi, side='left')
+            starts = np.maximum(self.indptr[first:last], lo)
+            ends = np.minimum(self.indptr[first + 1:last + 1], hi)
+            nonempty = ends > starts
+            out[first:last][nonempty] += np.add.reduceat(contributions, starts[nonempty] - lo)
+        return out
+
+    def sparse_dot(self, other):
+        """Return self @ other as a dense array, touching only the rows of other that self selects."""
+        rows = np.repeat(np.arange(self.shape[0], dtype=np.int64), np.diff(self.indptr))
+        starts = other.indptr[self.indices]
+        counts = other.indptr[self.indices + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            return np.zeros((self.shape[0], other.shape[1]), dtype=np.float32)
+        positions = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        keys = np.repeat(rows, counts) * other.shape[1] + other.indices[positions]
+        values = np.repeat(self.data, counts) * other.data[positions]
+        out = np.bincount(keys, weights=values, minlength=self.shape[0] * other.shape[1])
+        return out.reshape(self.shape[0], other.shape[1]).astype(np.float32)
+
+    @classmethod
+    def from_dense(cls, dense, threshold=0.0):
+        """Keep the entries of a dense matrix that are above threshold."""
+        mask = dense > threshold
+        indptr = np.concatenate(([0], np.cumsum(mask.sum(axis=1)))).astype(np.int64)
+        return cls(indptr, np.nonzero(mask)[1].astype(np.int32), dense[mask], dense.shape)
+
+    def transpose(self):
+        rows = np.repeat(np.arange(self.shape[0], dtype=np.int32), np.diff(self.indptr))
+        order = np.argsort(self.indices, kind='stable')
+        counts = np.bincount(self.indices, minlength=self.shape[1])
+        indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return SparseMatrix(indptr, rows[order], self.data[order], (self.shape[1], self.shape[0]))
+
+def build_term_document_matrix(documents):
+    """Return (doc IDs, {term: term ID}, idf, documents x terms SparseMatrix of log-tf * idf weights)."""
+    doc_ids = list(documents)
+    term_ids = {}
+    indptr = [0]
+    indices = []
+    counts = []
+    for content in documents.values():
+        tfs = {}
+        for token in re.findall(r'\w+', content.lower()):
+            term_id = term_ids.setdefault(token, len(term_ids))
+            tfs[term_id] = tfs.get(term_id, 0) + 1
+        indices.extend(tfs)
+        counts.extend(tfs.values())
+        indptr.append(len(indices))
+    num_docs, num_terms = len(doc_ids), len(term_ids)
+    indices = np.array(indices, dtype=np.int32)
+    doc_freqs = np.bincount(indices, minlength=num_terms)
+    idf = np.log(num_docs / np.maximum(doc_freqs, 1)).astype(np.float32)
+    data = ((1 + np.log(np.array(counts, dtype=np.float32))) * idf[indices]).astype(np.float32)
+    return doc_ids, term_ids, idf, SparseMatrix(np.array(indptr, dtype=np.int64), indices, data, (num_docs, num_terms))
+
+# Inverted-file approximate nearest-neighbor index
+class IVFIndex:
+    """
+    Inverted-file index over unit-length vectors.
+
+    Vectors are clustered with spherical k-means; a search scores the query
+    against the centroids, then exactly scores only the vectors in the `nprobe`
+    closest lists. Raising nprobe trades latency for recall; nprobe equal to the
+    number of lists is an exact search.
+    """
+    def __init__(self, vectors, n_lists=None, iterations=10, train_size=20000, seed=0, name='IVF'):
+        self.name = name  # model label of the search spans
+        self.vectors = vectors
+        num_vectors = len(vectors)
+        self.n_lists = max(1, min(n_lists or int(math.sqrt(num_vectors)), num_vectors))
+        rng = np.random.default_rng(seed)
+
+        # Train the centroids on a sample, then assign every vector
+        sample = vectors[np.sort(rng.choice(num_vectors, min(train_size, num_vectors), replace=False))]
+        self.n_lists = min(self.n_lists, len(sample))
+        centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(self.n_lists):
+                members = sample[assignments == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    centroids[c] = centroid / norm if norm else centroid
+        self.centroids = centroids
+
+        assignments = np.empty(num_vectors, dtype=np.int32)
+        for start in range(0, num_vectors, 65536):
+            assignments[start:start + 65536] = np.argmax(vectors[start:start + 65536] @ centroids.T, axis=1)
+        self.order = np.argsort(assignments, kind='stable').astype(np.int32)
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=self.n_lists))))
+
+    def search(self, query, top_k=10, nprobe=8):
+        """Return (ids, scores) of the top_k vectors by inner product, best first."""
+        with span('score', model=self.name):
+            nprobe = max(1, min(nprobe, self.n_lists))
+            lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+            ids = np.sort(np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists]))
+            if not len(ids):
+                return ids, np.empty(0, dtype=np.float32)
+            scores = self.vectors[ids] @ query
+        with span('top-k', model=self.name):
+            top = np.argpartition(-scores, min(top_k, len(ids)) - 1)[:top_k]
+            top = top[np.argsort(-scores[top])]
+            return ids[top], scores[top]
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+# Latent Semantic Analysis embeddings
+class LSAIndex:
+    """
+    Dense document embeddings from a randomized truncated SVD of the TF-IDF matrix.
+
+    Runs locally on the CPU with NumPy only. Document vectors are written to a
+    float32 memory-mapped file and searched through an IVFIndex; queries are
+    folded into the same space through the right singular vectors. Without a
+    vector_file the vectors go to a temporary file, removed by close() or when
+    the index is garbage-collected.
+    """
+    def __init__(self, documents, dimensions=128, vector_file=None, oversample=10, power_iterations=2, seed=0):
+        self.doc_ids, self.term_ids, self.idf, matrix = build_term_document_matrix(documents)
+        num_docs, num_terms = matrix.shape
+        transposed = matrix.transpose()
+
+        # Randomized range finder with power iterations (Halko et al.)
+        rng = np.random.default_rng(seed)
+        rank = max(1, min(dimensions + oversample, num_docs, num_terms))
+        basis, _ = np.linalg.qr(matrix.dot(rng.standard_normal((num_terms, rank), dtype=np.float32)))
+        for _ in range(power_iterations):
+            basis, _ = np.linalg.qr(transposed.dot(basis))
+            basis, _ = np.linalg.qr(matrix.dot(basis))
+        small = transposed.dot(basis).T
+        u_small, singular_values, vt = np.linalg.svd(small, full_matrices=False)
+        k = min(dimensions, len(singular_values))
+        self.term_vectors = vt[:k].T.astype(np.float32)
+
+        # Unit-length document vectors U * S, stored memory-mapped
+        doc_vectors = (basis @ u_small[:, :k]) * singular_values[:k]
+        doc_vectors /= np.maximum(np.linalg.norm(doc_vectors, axis=1, keepdims=True), 1e-12)
+        if vector_file is None:
+            handle, vector_file = tempfile.mkstemp(prefix='lsa_vectors_', suffix='.dat')
+            os.close(handle)
+            self._remove_vectors = weakref.finalize(self, _remove_file, vector_file)
+        else:
+            self._remove_vectors = None
+        self.vector_file = vector_file
+        stored = np.memmap(vector_file, dtype=np.float32, mode='w+', shape=doc_vectors.shape)
+        stored[:] = doc_vectors
+        stored.flush()
+        del stored
+        self.doc_vectors = np.memmap(vector_file, dtype=np.float32, mode='r', shape=doc_vectors.shape)
+        self.ann = IVFIndex(self.doc_vectors, seed=seed, name="Semantic Search (LSA)")
+
+    def close(self):
+        """Release the vector file, deleting it if it is a temporary one."""
+        self.doc_vectors = self.ann.vectors = None
+        if self._remove_vectors is not None:
+            self._remove_vectors()
+
+    def encode_query(self, text):
+        """Fold a query into the LSA space; returns None if no query term is in the vocabulary."""
+        tfs = {}
+        for token in re.findall(r'\w+', text.lower()):
+            if token in self.term_ids:
+                tfs[self.term_ids[token]] = tfs.get(self.term_ids[token], 0) + 1
+        if not tfs:
+            return None
+        term_ids = np.fromiter(tfs, dtype=np.int32)
+        weights = (1 + np.log(np.fromiter(tfs.values(), dtype=np.float32))) * self.idf[term_ids]
+        vector = weights @ self.term_vectors[term_ids]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def search(self, text, top_k=10, nprobe=8):
+        """Return [(doc, cosine score), ...] for the nearest documents to a query."""
+        with span('query-parse', model="Semantic Search (LSA)"):
+            query = self.encode_query(text)
+        if query is None:
+            return []
+        ids, scores = self.ann.search(query, top_k, nprobe)
+        return [(self.doc_ids[i], float(score)) for i, score in zip(ids, scores)]
+
+# Term-overlap search with a corpus-mined expansion thesaurus
+class ExpansionIndex:
+    """
+    Term-overlap ranking with query expansion mined from the corpus.
+
+    The thesaurus is the top-k co-occurrence (PMI) neighbor table of every term,
+    built offline with Proximity_Graph in one streaming pass, optionally merged
+    with a small hand-written synonym dict. Documents are tokenized once into
+    sorted arrays of unique term IDs, which are inverted into CSR postings, so a
+    query only touches the postings of its expanded terms. Expanded query
+    vectors are kept in an LRU cache keyed by the query terms.
+    """
+    def __init__(self, documents, tokenize, synonyms=None, neighbors_per_term=5, cache_size=1024, doc_tokens=None):
+        """doc_tokens optionally supplies already tokenized documents, in the order of documents."""
+        self.doc_ids = list(documents)
+        self.tokenize = tokenize
+        if doc_tokens is None:
+            doc_tokens = map(tokenize, documents.values())
+        token_lists = [list(tokens) for tokens in doc_tokens]
+        self.thesaurus = generate_proximal_nodes(token_lists, top_k=neighbors_per_term)
+        self.term_ids = self.thesaurus.term_ids
+        self.neighbor_ids = np.frombuffer(self.thesaurus.neighbor_ids, dtype=np.int32)
+        self.neighbor_offsets = np.frombuffer(self.thesaurus.offsets, dtype=np.int32)
+        self.synonyms = {term: tokenize(' '.join(related)) for term, related in (synonyms or {}).items()}
+
+        # Pre-tokenized documents as arrays of unique term IDs
+        self.doc_terms = [
+            np.unique(np.fromiter((self.term_ids[token] for token in tokens), dtype=np.int32, count=len(tokens)))
+            for tokens in token_lists
+        ]
+        self.doc_lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.float64)
+        del token_lists
+
+        # Inverted postings: documents containing term t are post_docs[post_offsets[t]:post_offsets[t + 1]]
+        num_terms = len(self.thesaurus)
+        lengths = np.array([len(terms) for terms in self.doc_terms], dtype=np.int64)
+        all_terms = np.concatenate(self.doc_terms) if self.doc_terms else np.zeros(0, dtype=np.int32)
+        order = np.argsort(all_terms, kind='stable')
+        self.post_docs = np.repeat(np.arange(len(self.doc_ids), dtype=np.int32), lengths)[order]
+        self.post_offsets = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(all_terms, minlength=num_terms), out=self.post_offsets[1:])
+
+        self.expand = lru_cache(maxsize=cache_size)(self._expand)
+
+    def _expand(self, query_terms):
+        """Return (term IDs, size) of the expanded query for a tuple of query terms."""
+        expanded = set(query_terms)
+        for term in query_terms:
+            expanded.update(self.synonyms.get(term, ()))
+            term_id = self.term_ids.get(term)
+            if term_id is not None:
+                neighbors = self.neighbor_ids[self.neighbor_offsets[term_id]:self.neighbor_offsets[term_id + 1]]
+                expanded.update(self.thesaurus.terms[i] for i in neighbors)
+        ids = np.array(sorted(self.term_ids[term] for term in expanded if term in self.term_ids), dtype=np.int32)
+        return ids, len(expanded)
+
+    def search(self, query):
+        """Return [(doc, score), ...] ranked by overlap with the expanded query."""
+        with span('query-parse', model="Term Overlap"):
+            query_terms = tuple(sorted(set(self.tokenize(query))))
+            if not query_terms:
+                return []
+            term_ids, size = self.expand(query_terms)
+        if not len(term_ids):
+            return []
+        with span('score', model="Term Overlap"):
+            docs = np.concatenate([self.post_docs[self.post_offsets[t]:self.post_offsets[t + 1]] for t in term_ids])
+            docs, common = np.unique(docs, return_counts=True)
+            scores = common / (math.sqrt(size) * np.sqrt(self.doc_lengths[docs]))
+        with span('top-k', model="Term Overlap"):
+            order = np.argsort(-scores, kind='stable')
+            return [(self.doc_ids[docs[i]], float(scores[i])) for i in order]
+
+# Spreading-activation network
+class SpreadingActivationNetwork:
+    """
+    Three-layer query-term / document / term spreading-activation network.
+
+    Query terms activate the documents they occur in through cosine-normalized
+    tf-idf links; activated documents feed back into their terms, which
+    re-activate documents, for a configurable number of iterations. Each layer
+    is normalized to a peak of 1 per query and only nodes above the activation
+    threshold keep firing, so every step is one sparse product over the
+    active nodes' links. Document scores accumulate the activation of every
+    pass, damped by `decay` per iteration. Queries are batched as the rows of a
+    sparse query-term matrix.
+    """
+    def __init__(self, documents, decay=0.5):
+        self.doc_ids, self.term_ids, self.idf, matrix = build_term_document_matrix(documents)
+        self.decay = decay
+        lengths = np.diff(matrix.indptr)
+        norms = np.zeros(matrix.shape[0], dtype=np.float32)
+        nonempty = lengths > 0
+        norms[nonempty] = np.sqrt(np.add.reduceat(matrix.data ** 2, matrix.indptr[:-1][nonempty]))
+        data = matrix.data / np.repeat(np.maximum(norms, 1e-12), lengths)
+        self.doc_term = SparseMatrix(matrix.indptr, matrix.indices, data.astype(np.float32), matrix.shape)
+        self.term_doc = self.doc_term.transpose()
+
+    def encode(self, queries):
+        """Return the batch of queries as a queries x terms SparseMatrix of unit-length idf weights."""
+        indptr = [0]
+        indices = []
+        for query in queries:
+            term_ids = {self.term_ids[token] for token in re.findall(r'\w+', query.lower()) if token in self.term_ids}
+            indices.extend(sorted(term_ids))
+            indptr.append(len(indices))
+        indptr = np.array(indptr, dtype=np.int64)
+        indices = np.array(indices, dtype=np.int32)
+        data = self.idf[indices].astype(np.float32)
+        lengths = np.diff(indptr)
+        nonempty = lengths > 0
+        norms = np.ones(len(queries), dtype=np.float32)
+        norms[nonempty] = np.sqrt(np.add.reduceat(data ** 2, indptr[:-1][nonempty]))
+        data /= np.repeat(np.maximum(norms, 1e-12), lengths)
+        return SparseMatrix(indptr, indices, data, (len(queries), len(self.term_ids)))
+
+    def activate(self, query_matrix, iterations=2, threshold=0.1):
+        """Spread activation for a batch of queries; returns a queries x documents score array."""
+        doc_activation = self._normalize(query_matrix.sparse_dot(self.term_doc))
+        scores = doc_activation.copy()
+        for iteration in range(1, iterations + 1):
+            active_docs = SparseMatrix.from_dense(doc_activation, threshold)
+            if not len(active_docs.data):
+                break
+            term_activation = self._normalize(active_docs.sparse_dot(self.doc_term))
+            active_terms = SparseMatrix.from_dense(term_activation, threshold)
+            doc_activation = self._normalize(active_terms.sparse_dot(self.term_doc))
+            scores += self.decay ** iteration * doc_activation
+        return scores
+
+    @staticmethod
+    def _normalize(activation):
+        peaks = activation.max(axis=1, keepdims=True) if activation.shape[1] else 1.0
+        return activation / np.maximum(peaks, 1e-12)
+
+    def search(self, queries, iterations=2, threshold=0.1, top_k=20, batch_size=32):
+        """Return one [(doc, score), ...] ranking per query, processing batch_size queries at a time."""
+        rankings = []
+        for start in range(0, len(queries), batch_size):
+            with span('query-parse', model="Spreading Activation"):
+                query_matrix = self.encode(queries[start:start + batch_size])
+            with span('score', model="Spreading Activation"):
+                scores = self.activate(query_matrix, iterations, threshold)
+            with span('top-k', model="Spreading Activation"):
+                for row in scores:
+                    candidates = np.flatnonzero(row > 0)
+                    if len(candidates) > top_k:
+                        candidates = candidates[np.argpartition(-row[candidates], top_k - 1)[:top_k]]
+                    candidates = candidates[np.argsort(-row[candidates], kind='stable')]
+                    rankings.append([(self.doc_ids[i], float(row[i])) for i in candidates])
+        return rankings
@@ -0,0 +1,106 @@
+import math
+import heapq
+from array import array
+
+# Weighted term co-occurrence graph for the Proximal Nodes Model
+class ProximityGraph:
+    """
+    Top-k weighted co-occurrence neighbors per term, stored CSR-style.
+
+    The neighbors of self.terms[i] are the term IDs in
+    neighbor_ids[offsets[i]:offsets[i + 1]], with their PMI weights at the same
+    positions in weights, strongest first.
+    """
+    def __init__(self, terms, offsets, neighbor_ids, weights):
+        self.terms = terms
+        self.term_ids = {term: term_id for term_id, term in enumerate(terms)}
+        self.offsets = offsets
+        self.neighbor_ids = neighbor_ids
+        self.weights = weights
+
+    def __contains__(self, term):
+        return term in self.term_ids
+
+    def __len__(self):
+        return len(self.terms)
+
+    def neighbors(self, term):
+        """Return [(neighbor, weight), ...] for a term, strongest first."""
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return []
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return [(self.terms[self.neighbor_ids[i]], self.weights[i]) for i in range(start, end)]
+
+    def __getitem__(self, term):
+        return dict(self.neighbors(term))
+
+def generate_proximal_nodes(token_streams, window=5, top_k=10, min_count=2, max_pairs=2000000):
+    """
+    Build a ProximityGraph in one streaming pass over an iterable of token lists.
+
+    Two terms co-occur when they are at most `window` tokens apart. Pair counts
+    are kept in a dictionary bounded by `max_pairs`; when it fills up, the rarest
+    pairs are dropped (lossy counting), so memory does not grow with the square
+    of the vocabulary. Pairs seen fewer than `min_count` times are ignored, the
+    rest are weighted by positive PMI, and only the `top_k` strongest neighbors
+    of each term are kept.
+    """
+    term_ids = {}
+    terms = []
+    term_counts = array('i')
+    pair_counts = {}
+    prune_floor = 0
+    total_tokens = 0
+
+    for tokens in token_streams:
+        ids = []
+        for token in tokens:
+            term_id = term_ids.get(token)
+            if term_id is None:
+                term_id = term_ids[token] = len(terms)
+                terms.append(token)
+                term_counts.append(0)
+            term_counts[term_id] += 1
+            ids.append(term_id)
+        total_tokens += len(ids)
+
+        for i, term_id in enumerate(ids):
+            for other_id in ids[i + 1:i + 1 + window]:
+                if other_id == term_id:
+                    continue
+                low, high = (term_id, other_id) if term_id < other_id else (other_id, term_id)
+                key = (low << 32) | high
+                pair_counts[key] = pair_counts.get(key, 0) + 1
+
+            # Lossy counting: drop the rarest pairs once the table is full
+            while len(pair_counts) > max_pairs:
+                prune_floor += 1
+                pair_counts = {key: count for key, count in pair_counts.items() if count > prune_floor}
+
+    # Keep the top-k positive-PMI neighbors of every term
+    heaps = [[] for _ in terms]
+    for key, count in pair_counts.items():
+        if count < min_count:
+            continue
+        low, high = key >> 32, key & 0xFFFFFFFF
+        pmi = math.log(count * total_tokens / (term_counts[low] * term_counts[high]))
+        if pmi <= 0:
+            continue
+        for term_id, other_id in ((low, high), (high, low)):
+            heap = heaps[term_id]
+            if len(heap) < top_k:
+                heapq.heappush(heap, (pmi, other_id))
+            elif pmi > heap[0][0]:
+                heapq.heapreplace(heap, (pmi, other_id))
+    del pair_counts
+
+    offsets = array('i', [0])
+    neighbor_ids = array('i')
+    weights = array('d')
+    for heap in heaps:
+        for pmi, other_id in sorted(heap, reverse=True):
+            neighbor_ids.append(other_id)
+            weights.append(pmi)
+        offsets.append(len(neighbor_ids))
+    return ProximityGraph(terms, offsets, neighbor_ids, weights)
@@ -0,0 +1,254 @@
+import re
+import importlib
+import time
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import cached_property
+from Document_Store import DocumentStore
+from Instrumentation import span, count
+from Inference_Network import InferenceNetwork
+
+# Shared corpus and retrieval model registry for UnifiedIRApp
+def tokenize(text):
+    return re.findall(r'\w+', text.lower())
+
+class Corpus:
+    """
+    The .txt documents of a directory, tokenized once on first use.
+
+    Documents are analyzed in a single pass into a vocabulary and one array of
+    term IDs per document, which the inference network and expansion models
+    build on instead of tokenizing the raw text again. Engines with their own
+    text processing (Structural_Engine's phrases and stop words) start from the
+    same tokens, and every engine is built once per corpus.
+    """
+    def __init__(self, directory='data'):
+        self.directory = directory
+
+    @cached_property
+    def documents(self):
+        """Lazily read {path: text} store; only paths and sizes stay resident."""
+        with span('crawl'):
+            return DocumentStore(self.directory)
+
+    @cached_property
+    def analysis(self):
+        """(doc IDs, terms, {term: term ID}, [array of term IDs per document])."""
+        terms = []
+        term_ids = {}
+        doc_terms = []
+        for content in self.documents.values():
+            with span('tokenize'):
+                ids = array('i')
+                for token in tokenize(content):
+                    term_id = term_ids.get(token)
+                    if term_id is None:
+                        term_id = term_ids[token] = len(terms)
+                        terms.append(token)
+                    ids.append(term_id)
+            doc_terms.append(ids)
+        return list(self.documents), terms, term_ids, doc_terms
+
+    @property
+    def doc_ids(self):
+        return self.analysis[0]
+
+    @property
+    def terms(self):
+        return self.analysis[1]
+
+    @property
+    def term_ids(self):
+        return self.analysis[2]
+
+    @property
+    def doc_terms(self):
+        return self.analysis[3]
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def token_streams(self):
+        """Yield each document's tokens, rebuilt from its term IDs."""
+        terms = self.terms
+        for ids in self.doc_terms:
+            yield [terms[term_id] for term_id in ids]
+
+    @cached_property
+    def structural_engine(self):
+        """Structural_Engine's StructuralEngine, shared by the models built on it."""
+        structural = importlib.import_module('Structural_Engine')
+        return structural.StructuralEngine(self.directory, documents=self.documents, doc_tokens=self.token_streams())
+
+    def snippet(self, doc, length=200):
+        return self.documents.snippet(doc, length).replace('\n', ' ') + '...'
+
+# Model registry
+MODELS = {}  # display name -> model class
+
+def register_model(name):
+    """Class decorator adding a retrieval model to MODELS under its display name."""
+    def register(cls):
+        cls.name = name
+        MODELS[name] = cls
+        return cls
+    return register
+
+# Each model is a thin adapter over the engine its own app uses, so a model name
+# ranks the same here, in its app and in Evaluation_Harness
+@register_model("Binary Independence Model")
+class BinaryIndependenceRetrieval:
+    def __init__(self, corpus):
+        self.engine = corpus.structural_engine
+
+    def retrieve(self, query, relevant_docs=None):
+        return self.engine.rank(query, "Binary Independence Model", relevant_docs)
+
+@register_model("Proximal Nodes Model")
+class ProximalNodesRetrieval:
+    def __init__(self, corpus):
+        self.engine = corpus.structural_engine
+
+    def retrieve(self, query):
+        return self.engine.rank(query, "Proximal Nodes Model")
+
+@register_model("Set-Theoretic Model")
+class GeneralizedVectorRetrieval:
+    """The generalized vector space model of Set_Theoretic_Engine over the shared tokens."""
+    def __init__(self, corpus):
+        set_theoretic = importlib.import_module('Set_Theoretic_Engine')
+        self.engine = set_theoretic.SetTheoreticEngine(corpus.directory, corpus.documents, corpus.token_streams())
+
+    def retrieve(self, query):
+        return self.engine.rank(query, "Generalized Vector Model")
+
+@register_model("Neural Network Model")
+class ExpandedOverlapRetrieval:
+    """Neural_Network_Engine's term overlap with co-occurrence query expansion, over the shared tokens."""
+    def __init__(self, corpus):
+        neural = importlib.import_module('Neural_Network_Engine')
+        self.index = neural.ExpansionIndex(corpus.documents, tokenize, doc_tokens=corpus.token_streams())
+
+    def retrieve(self, query):
+        return self.index.search(query)
+
+@register_model("Probabilistic Model")
+class InferenceNetworkRetrieval:
+    """InQuery-style inference network; queries may use #and, #or, #not, #sum, #wsum and #max."""
+    def __init__(self, corpus):
+        self.network = InferenceNetwork(corpus.documents, tokenize, corpus.token_streams())
+
+    def retrieve(self, query):
+        return self.network.rank(query)
+
+# Rank fusion
+FUSION_METHODS = ('rrf', 'combsum')
+
+def fuse_rankings(rankings, method='rrf', k=60, depth=100):
+    """
+    Merge several [(doc, score), ...] rankings into one.
+
+    'rrf' is reciprocal rank fusion, sum(1 / (k + rank)); 'combsum' sums
+    scores min-max normalized per ranking. Only the top `depth` results of
+    each ranking take part.
+    """
+    fused = {}
+    for ranking in rankings:
+        ranking = ranking[:depth]
+        if method == 'rrf':
+            for rank, (doc, _) in enumerate(ranking, 1):
+                fused[doc] = fused.get(doc, 0.0) + 1.0 / (k + rank)
+        elif method == 'combsum':
+            if not ranking:
+                continue
+            scores = [score for _, score in ranking]
+            low, high = min(scores), max(scores)
+            for doc, score in ranking:
+                fused[doc] = fused.get(doc, 0.0) + ((score - low) / (high - low) if high > low else 1.0)
+        else:
+            raise ValueError(f"unknown fusion method: {method}")
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
+
+class RetrievalService:
+    """
+    One shared Corpus plus the registered models, each built the first time it is used.
+
+    With `link_priors` (a Link_Analysis.LinkPriors) and a non-zero
+    `prior_weight`, every model's ranking is mixed with the static link prior.
+    """
+    def __init__(self, directory='data', link_priors=None, prior_weight=0.0):
+        self.corpus = Corpus(directory)
+        self.link_priors = link_priors
+        self.prior_weight = prior_weight
+        self.models = {}
+        self.build_locks = {}  # model name -> lock held while that model is built
+        self.lock = threading.Lock()
+        self.executors = {}  # model name -> its own worker thread, so a stuck model holds no other model's slot
+        self.running = {}  # model name -> future of its latest fusion run
+
+    def model(self, name):
+        """Return the named model, building it on first use; only callers of that model wait for the build."""
+        model = self.models.get(name)
+        if model is not None:
+            return model
+        with self.lock:
+            build_lock = self.build_locks.setdefault(name, threading.Lock())
+        with build_lock:
+            if name not in self.models:
+                self.models[name] = MODELS[name](self.corpus)
+        return self.models[name]
+
+    def retrieve(self, name, query):
+        """Return [(doc path, score), ...] from the named model, best first."""
+        with span('retrieve', model=name):
+            results = self.model(name).retrieve(query)
+        if self.link_priors is not None and self.prior_weight:
+            results = self.link_priors.mix(results, self.prior_weight)
+        return results
+
+    def fuse(self, query, names=None, method='rrf', depth=100, time_budget=2.0):
+        """
+        Run several models, each on its own worker thread, and fuse their top `depth` results.
+
+        The scorers are pure Python and take turns on the GIL, so the models do
+        not run in parallel: the budget bounds the whole fusion, not each model.
+        Models are started and fused in `names` order. Those still running
+        `time_budget` seconds after the call started are left out, and so are
+        those whose run from an earlier call has not finished yet (a running
+        thread cannot be cancelled). Returns (fused ranking, {model: seconds taken},
+        [models over the budget], {model: exception raised}).
+        """
+        names = list(names or MODELS)
+
+        def timed_retrieve(name):
+            start = time.perf_counter()
+            results = self.retrieve(name, query)
+            return results, time.perf_counter() - start
+
+        futures = {}  # model name -> future; models still busy from an earlier call have none
+        with self.lock:
+            for name in names:
+                previous = self.running.get(name)
+                if previous is not None and not previous.done():
+                    continue
+                if name not in self.executors:
+                    self.executors[name] = ThreadPoolExecutor(max_workers=1, thread_name_prefix='retrieval')
+                futures[name] = self.running[name] = self.executors[name].submit(timed_retrieve, name)
+        done, _ = wait(futures.values(), timeout=time_budget)
+
+        rankings = []
+        timings = {}
+        skipped = []
+        errors = {}
+        for name in names:
+            future = futures.get(name)
+            if future not in done:
+                skipped.append(name)
+            elif future.exception() is not None:
+                errors[name] = future.exception()
+                count('fusion_errors', model=name)
+            else:
+                results, timings[name] = future.result()
+                rankings.append(results)
+        return fuse_rankings(rankings, method, depth=depth), timings, skipped, errors
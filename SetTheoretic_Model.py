@@ -1,32 +1,76 @@
 import os
-import re
 import time
-import math
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QLineEdit, QSplitter, QTreeWidget, QTreeWidgetItem, QTextBrowser, QWidget, QPushButton, QLabel, QComboBox, QDialog, QTextEdit
+    QApplication, QMainWindow, QVBoxLayout, QLineEdit, QSplitter, QWidget, QPushButton, QLabel, QComboBox, QListView
 )
-from PyQt5.QtCore import Qt, QUrl
-
-# Document Content Viewer
-class DocumentViewer(QDialog):
-    def __init__(self, file_path):
-        super().__init__()
-        self.setWindowTitle(os.path.basename(file_path))
-        self.resize(800, 600)
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from PyQt5.QtGui import QColor
+from Document_Viewer import PagedDocumentViewer as DocumentViewer
+from Set_Theoretic_Engine import SetTheoreticEngine
+
+# Lazily paged search results
+class SearchResultsModel(QAbstractListModel):
+    """
+    List model over a ranked result list.
+
+    Rows are handed to the view a page at a time through canFetchMore/fetchMore
+    as the user scrolls, and each row's snippet is only sliced when the view asks
+    for it, so rendering cost follows the visible rows rather than the result count.
+    """
+    PAGE_SIZE = 100
+    SNIPPET_LENGTH = 200
+
+    def __init__(self, documents, parent=None):
+        super().__init__(parent)
+        self.documents = documents
+        self.ranked_results = []
+        self.loaded = 0
+        self.min_score = 0
+        self.score_range = 1
+
+    def set_results(self, ranked_results):
+        """Replace the results with a new ranked list of (doc, score) pairs."""
+        self.beginResetModel()
+        self.ranked_results = ranked_results
+        self.loaded = min(self.PAGE_SIZE, len(ranked_results))
+        max_score = ranked_results[0][1] if ranked_results else 0
+        self.min_score = ranked_results[-1][1] if ranked_results else 0
+        self.score_range = max_score - self.min_score if max_score != self.min_score else 1
+        self.endResetModel()
 
-        # Layout for the viewer
-        layout = QVBoxLayout()
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
 
-        # Independent text browser for displaying document content
-        content_display = QTextBrowser(self)
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content_display.setText(file.read())
-        except Exception as e:
-            content_display.setText(f"Could not open file: {str(e)}")
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.loaded < len(self.ranked_results)
 
-        layout.addWidget(content_display)
-        self.setLayout(layout)
+    def fetchMore(self, parent):
+        count = min(self.PAGE_SIZE, len(self.ranked_results) - self.loaded)
+        if parent.isValid() or count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        doc, score = self.ranked_results[index.row()]
+        if role == Qt.DisplayRole:
+            snippet = self.documents.snippet(doc, self.SNIPPET_LENGTH).replace('\n', ' ') + '...'
+            return f"{os.path.basename(doc)}    Score: {score:.4f}\n{snippet}"
+        if role == Qt.DecorationRole:
+            return self.score_to_color((score - self.min_score) / self.score_range)
+        if role in (Qt.ToolTipRole, Qt.UserRole):
+            return doc
+        return None
+
+    @staticmethod
+    def score_to_color(relative_score):
+        """Convert a relative score to a color gradient from red to green."""
+        red = int((1 - relative_score) * 255)
+        green = int(relative_score * 255)
+        return QColor(red, green, 0)
 
 class SetTheoreticIRApp(QMainWindow):
     def __init__(self):
@@ -34,14 +78,11 @@ class SetTheoreticIRApp(QMainWindow):
         self.setWindowTitle("Set-Theoretic IR Models - Generalized Vector Model")
         self.resize(1200, 800)
 
-        # Initialize term-document structures
-        self.documents = {}
-        self.term_document_matrix = {}
-        self.document_vectors = {}
         self.recent_searches = []
 
-        # Load documents
-        self.load_documents('data')
+        # Load documents and build the index structures
+        self.engine = SetTheoreticEngine('data')
+        self.documents = self.engine.documents
 
         # UI Elements
         splitter = QSplitter(Qt.Vertical)
@@ -52,12 +93,16 @@ class SetTheoreticIRApp(QMainWindow):
         self.search_bar = QLineEdit(self)
         self.search_bar.setPlaceholderText("Enter query, e.g., 'example query'")
         self.search_button = QPushButton("Search")
+        self.model_selector = QComboBox(self)
+        self.model_selector.addItems(SetTheoreticEngine.MODELS)
         self.search_dropdown = QComboBox(self)
         self.search_dropdown.addItems(self.recent_searches)
         self.search_button.clicked.connect(self.perform_search)
         self.search_dropdown.currentIndexChanged.connect(self.populate_search_from_dropdown)
         search_layout.addWidget(QLabel("Search:"))
         search_layout.addWidget(self.search_bar)
+        search_layout.addWidget(QLabel("Model (Boolean models accept AND, OR, NOT and parentheses):"))
+        search_layout.addWidget(self.model_selector)
         search_layout.addWidget(self.search_button)
         search_layout.addWidget(QLabel("Recent Searches:"))
         search_layout.addWidget(self.search_dropdown)
@@ -65,10 +110,17 @@ class SetTheoreticIRApp(QMainWindow):
         splitter.addWidget(search_widget)
 
         # Results display
-        self.results_browser = QTextBrowser()
-        self.results_browser.setOpenLinks(False)
-        self.results_browser.anchorClicked.connect(self.open_document_viewer)
-        splitter.addWidget(self.results_browser)
+        results_widget = QWidget()
+        results_layout = QVBoxLayout(results_widget)
+        self.results_summary = QLabel("Search Results:")
+        self.results_model = SearchResultsModel(self.documents, self)
+        self.results_view = QListView()
+        self.results_view.setModel(self.results_model)
+        self.results_view.setUniformItemSizes(True)
+        self.results_view.clicked.connect(self.open_document_viewer)
+        results_layout.addWidget(self.results_summary)
+        results_layout.addWidget(self.results_view)
+        splitter.addWidget(results_widget)
 
         splitter.setStretchFactor(0, 1)  # Search bar takes less space
         splitter.setStretchFactor(1, 4)  # Results browser takes more space
@@ -79,57 +131,12 @@ class SetTheoreticIRApp(QMainWindow):
         layout.addWidget(splitter)
         self.setCentralWidget(container)
 
-        # Build term-document matrix
-        self.build_term_document_matrix()
-        self.calculate_document_vectors()
-
-    def load_documents(self, base_dir):
-        """Load documents from the data directory."""
-        for root, dirs, files in os.walk(base_dir):
-            for file in files:
-                if file.endswith('.txt'):
-                    file_path = os.path.join(root, file)
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        self.documents[file_path] = content
-
-    def tokenize(self, text):
-        """Tokenize text into words."""
-        return re.findall(r'\w+', text.lower())
-
-    def build_term_document_matrix(self):
-        """Build term-document matrix."""
-        for doc_path, content in self.documents.items():
-            tokens = self.tokenize(content)
-            for token in tokens:
-                if token not in self.term_document_matrix:
-                    self.term_document_matrix[token] = {}
-                if doc_path not in self.term_document_matrix[token]:
-                    self.term_document_matrix[token][doc_path] = 0
-                self.term_document_matrix[token][doc_path] += 1
-
-    def calculate_document_vectors(self):
-        """Calculate document vectors based on term frequency (TF) and inverse document frequency (IDF)."""
-        num_documents = len(self.documents)
-        for term, doc_freqs in self.term_document_matrix.items():
-            idf = math.log(num_documents / len(doc_freqs))
-            for doc, tf in doc_freqs.items():
-                if doc not in self.document_vectors:
-                    self.document_vectors[doc] = {}
-                self.document_vectors[doc][term] = tf * idf
-
-        # Normalize document vectors
-        for doc, vector in self.document_vectors.items():
-            norm = math.sqrt(sum(value ** 2 for value in vector.values()))
-            for term in vector:
-                vector[term] /= norm
-
     def perform_search(self):
         """Perform a search and display results."""
         start_time = time.time()
         query = self.search_bar.text()
         if not query:
-            self.results_browser.setText("Please enter a search query.")
+            self.results_summary.setText("Please enter a search query.")
             return
 
         # Add to recent searches
@@ -137,62 +144,20 @@ class SetTheoreticIRApp(QMainWindow):
             self.recent_searches.insert(0, query)
             self.search_dropdown.insertItem(0, query)
 
-        tokens = self.tokenize(query)
-        query_vector = {}
-        num_documents = len(self.documents)
-
-        # Build query vector
-        for token in tokens:
-            if token in self.term_document_matrix:
-                idf = math.log(num_documents / len(self.term_document_matrix[token]))
-                query_vector[token] = idf
-
-        # Normalize query vector
-        norm = math.sqrt(sum(value ** 2 for value in query_vector.values()))
-        for token in query_vector:
-            query_vector[token] /= norm
-
-        # Calculate cosine similarity
-        scores = {}
-        for doc, doc_vector in self.document_vectors.items():
-            score = 0
-            for term, weight in query_vector.items():
-                score += weight * doc_vector.get(term, 0)
-            if score > 0:
-                scores[doc] = score
-
         # Rank results
-        ranked_results = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        ranked_results = self.engine.rank(query, self.model_selector.currentText())
 
-        # Display results
+        # Display results; rows and snippets are fetched by the view as it scrolls
         elapsed_time = time.time() - start_time
-        max_score = ranked_results[0][1] if ranked_results else 0
-        min_score = ranked_results[-1][1] if ranked_results else 0
-        score_range = max_score - min_score if max_score != min_score else 1
-
-        results_html = f"<b>Search Results:</b> ({len(ranked_results)} results found in {elapsed_time:.4f} seconds)<br><br>"
-        for rank, (doc, score) in enumerate(ranked_results):
-            doc_name = os.path.basename(doc)
-            snippet = self.documents[doc][:200].replace('\n', ' ') + '...'
-            # Generate relative color gradient from red to green
-            relative_score = (score - min_score) / score_range
-            color = self.score_to_color(relative_score)
-            results_html += (
-                f"<a href='{doc}' style='color:black; text-decoration:none;'><b>{doc_name}</b></a> "
-                f"<span style='color:{color};'>Score: {score:.4f}</span><br>{snippet}<br><br>"
-            )
-
-        self.results_browser.setHtml(results_html)
-
-    def score_to_color(self, relative_score):
-        """Convert a relative score to a color gradient from red to green."""
-        red = int((1 - relative_score) * 255)
-        green = int(relative_score * 255)
-        return f"rgb({red},{green},0)"
-
-    def open_document_viewer(self, url):
-        """Open a new window to display the content of the clicked document."""
-        file_path = url.toString().replace("%5C", '\\')
+        self.results_summary.setText(
+            f"<b>Search Results:</b> ({len(ranked_results)} results found in {elapsed_time:.4f} seconds)"
+        )
+        self.results_model.set_results(ranked_results)
+        self.results_view.scrollToTop()
+
+    def open_document_viewer(self, index):
+        """Open a new window to display the content of the clicked result."""
+        file_path = index.data(Qt.UserRole)
         if file_path in self.documents:
             viewer = DocumentViewer(file_path)
             viewer.exec_()
@@ -0,0 +1,578 @@
+import re
+import math
+from array import array
+from functools import lru_cache, cached_property
+import numpy as np
+from Document_Store import DocumentStore
+from Instrumentation import span
+
+# Generalized Vector Space Model
+class GeneralizedVectorIndex:
+    """
+    Sparse Generalized Vector Space Model over weighted postings lists.
+
+    Each document's term-occurrence pattern is hashed as a sparse bitset (the
+    sorted term IDs), so only the minterms that actually occur in the corpus are
+    materialized instead of all 2^t of them. Term vectors are kept as parallel
+    arrays of minterm IDs and weights, and the transposed minterm -> term arrays
+    let a term's correlation row be computed from its own minterms only. The
+    most recently used `cache_size` correlation rows are kept.
+    """
+    def __init__(self, postings, num_documents, cache_size=1024):
+        self.terms = list(postings)
+        self.term_ids = {term: term_id for term_id, term in enumerate(self.terms)}
+
+        # Forward view of the postings; term IDs are appended in ascending order
+        doc_terms = [array('i') for _ in range(num_documents)]
+        doc_weights = [array('d') for _ in range(num_documents)]
+        for term_id, term in enumerate(self.terms):
+            doc_ids, weights = postings[term]
+            for doc_id, weight in zip(doc_ids, weights):
+                doc_terms[doc_id].append(term_id)
+                doc_weights[doc_id].append(weight)
+
+        # Assign each distinct occurrence pattern a minterm ID and accumulate
+        # the per-term minterm factors c(i, r) = sum of w(i, j) over docs j in r
+        patterns = {}
+        minterm_factors = [{} for _ in self.terms]
+        self.doc_minterm = array('i')
+        for doc_id in range(num_documents):
+            minterm = patterns.setdefault(doc_terms[doc_id].tobytes(), len(patterns))
+            self.doc_minterm.append(minterm)
+            for term_id, weight in zip(doc_terms[doc_id], doc_weights[doc_id]):
+                factors = minterm_factors[term_id]
+                factors[minterm] = factors.get(minterm, 0.0) + weight
+        self.num_minterms = len(patterns)
+        del patterns
+
+        # Normalized term vectors k_i in minterm space, plus their transpose
+        self.term_minterms = []
+        self.term_weights = []
+        minterm_terms = [array('i') for _ in range(self.num_minterms)]
+        minterm_weights = [array('d') for _ in range(self.num_minterms)]
+        for term_id, factors in enumerate(minterm_factors):
+            norm = math.sqrt(sum(value ** 2 for value in factors.values()))
+            minterms = array('i', sorted(factors))
+            weights = array('d', (factors[m] / norm if norm else 0.0 for m in minterms))
+            self.term_minterms.append(minterms)
+            self.term_weights.append(weights)
+            for minterm, weight in zip(minterms, weights):
+                minterm_terms[minterm].append(term_id)
+                minterm_weights[minterm].append(weight)
+        self.minterm_terms = minterm_terms
+        self.minterm_weights = minterm_weights
+
+        # Document norms in minterm space, |sum_i w(i, j) * k_i|. The minterm
+        # factors of a pattern's terms are gathered once for all documents with
+        # that pattern, which then only differ in their weights
+        term_lengths = np.array([len(minterms) for minterms in self.term_minterms], dtype=np.int64)
+        term_offsets = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(term_lengths, out=term_offsets[1:])
+        all_minterms = np.frombuffer(b''.join(minterms.tobytes() for minterms in self.term_minterms), dtype=np.int32)
+        all_k = np.frombuffer(b''.join(weights.tobytes() for weights in self.term_weights), dtype=np.float64)
+        pattern_docs = [array('i') for _ in range(self.num_minterms)]
+        for doc_id, minterm in enumerate(self.doc_minterm):
+            pattern_docs[minterm].append(doc_id)
+        self.doc_norms = array('d', bytes(8 * num_documents))
+        for docs in pattern_docs:
+            pattern_terms = np.frombuffer(doc_terms[docs[0]], dtype=np.int32)
+            lengths = term_lengths[pattern_terms]
+            total = int(lengths.sum())
+            if not total:
+                continue
+            # Positions of every (term, minterm) factor of the pattern in all_minterms/all_k
+            positions = np.arange(total) + np.repeat(term_offsets[pattern_terms] - (np.cumsum(lengths) - lengths), lengths)
+            minterms, columns = np.unique(all_minterms[positions], return_inverse=True)
+            k = all_k[positions]
+            for doc_id in docs:
+                weights = np.repeat(np.frombuffer(doc_weights[doc_id], dtype=np.float64), lengths)
+                projected = np.bincount(columns.ravel(), weights=weights * k, minlength=len(minterms))
+                self.doc_norms[doc_id] = math.sqrt(float(projected @ projected))
+
+        self.correlation = lru_cache(maxsize=cache_size)(self._correlation)
+
+    def _correlation(self, term):
+        """Return the sparse correlation row {term: k_i . k_l} for a term."""
+        row = {}
+        term_id = self.term_ids.get(term)
+        if term_id is not None:
+            for minterm, k in zip(self.term_minterms[term_id], self.term_weights[term_id]):
+                for other_id, other_k in zip(self.minterm_terms[minterm], self.minterm_weights[minterm]):
+                    other = self.terms[other_id]
+                    row[other] = row.get(other, 0.0) + k * other_k
+        return row
+
+    def expand_query(self, query_vector):
+        """
+        Map a term-space query vector onto correlated terms.
+
+        Returns the expanded weights {term: sum_i w(i, q) * k_i . k_term} and the
+        query norm in minterm space, so that a document score is the dot product
+        of the expanded weights with its term weights divided by both norms.
+        """
+        expanded = {}
+        for term, weight in query_vector.items():
+            for other, corr in self.correlation(term).items():
+                expanded[other] = expanded.get(other, 0.0) + weight * corr
+        norm_sq = sum(weight * expanded.get(term, 0.0) for term, weight in query_vector.items())
+        return expanded, math.sqrt(max(norm_sq, 0.0))
+
+# Compressed bitmap postings for the Boolean models
+class CompressedBitmap:
+    """
+    Roaring-style compressed bitmap of document IDs.
+
+    IDs are split into 2^16-wide chunks keyed by their high 16 bits. Sparse chunks
+    are stored as sorted arrays of the low bits and dense chunks as one integer
+    bitmap; AND/OR/AND-NOT run chunk by chunk as integer bitmap operations.
+    """
+    ARRAY_LIMIT = 4096
+    CHUNK_BYTES = 1 << 13
+
+    def __init__(self, containers=None):
+        self.containers = containers if containers is not None else {}
+
+    @classmethod
+    def from_ids(cls, ids):
+        chunks = {}
+        for doc_id in ids:
+            chunks.setdefault(doc_id >> 16, []).append(doc_id & 0xFFFF)
+        return cls({key: cls._pack(sorted(lows)) for key, lows in chunks.items()})
+
+    @classmethod
+    def _pack(cls, lows):
+        """Store a sorted list of low bits as an array or a dense bitmap, whichever is smaller."""
+        if len(lows) < cls.ARRAY_LIMIT:
+            return array('H', lows)
+        dense = bytearray(cls.CHUNK_BYTES)
+        for low in lows:
+            dense[low >> 3] |= 1 << (low & 7)
+        return int.from_bytes(dense, 'little')
+
+    @classmethod
+    def _bits(cls, container):
+        if isinstance(container, int):
+            return container
+        dense = bytearray(cls.CHUNK_BYTES)
+        for low in container:
+            dense[low >> 3] |= 1 << (low & 7)
+        return int.from_bytes(dense, 'little')
+
+    @classmethod
+    def _lows(cls, bits):
+        dense = bits.to_bytes(cls.CHUNK_BYTES, 'little')
+        return [(i << 3) | bit for i, byte in enumerate(dense) if byte for bit in range(8) if byte >> bit & 1]
+
+    @classmethod
+    def _repack(cls, bits):
+        if bits.bit_count() < cls.ARRAY_LIMIT:
+            return array('H', cls._lows(bits))
+        return bits
+
+    def __and__(self, other):
+        containers = {}
+        for key, container in self.containers.items():
+            if key in other.containers:
+                bits = self._bits(container) & self._bits(other.containers[key])
+                if bits:
+                    containers[key] = self._repack(bits)
+        return CompressedBitmap(containers)
+
+    def __or__(self, other):
+        containers = dict(self.containers)
+        for key, container in other.containers.items():
+            if key in containers:
+                containers[key] = self._repack(self._bits(containers[key]) | self._bits(container))
+            else:
+                containers[key] = container
+        return CompressedBitmap(containers)
+
+    def __sub__(self, other):
+        containers = {}
+        for key, container in self.containers.items():
+            if key not in other.containers:
+                containers[key] = container
+                continue
+            bits = self._bits(container) & ~self._bits(other.containers[key])
+            if bits:
+                containers[key] = self._repack(bits)
+        return CompressedBitmap(containers)
+
+    def __len__(self):
+        return sum(c.bit_count() if isinstance(c, int) else len(c) for c in self.containers.values())
+
+    def __iter__(self):
+        for key in sorted(self.containers):
+            container = self.containers[key]
+            lows = self._lows(container) if isinstance(container, int) else container
+            for low in lows:
+                yield (key << 16) | low
+
+# Boolean query parsing shared by the Boolean, p-norm and fuzzy set models
+def parse_boolean_query(query):
+    """
+    Parse a query with AND, OR, NOT and parentheses into a tree of tuples:
+    ('term', t), ('not', node), ('and', [nodes]) or ('or', [nodes]).
+    Adjacent operands without an operator are combined with AND.
+    """
+    tokens = re.findall(r'\(|\)|\w+', query)
+    position = [0]
+
+    def peek():
+        return tokens[position[0]] if position[0] < len(tokens) else None
+
+    def parse_or():
+        children = [parse_and()]
+        while peek() == 'OR':
+            position[0] += 1
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ('or', children)
+
+    def parse_and():
+        children = [parse_not()]
+        while peek() not in (None, 'OR', ')'):
+            if peek() == 'AND':
+                position[0] += 1
+            children.append(parse_not())
+        return children[0] if len(children) == 1 else ('and', children)
+
+    def parse_not():
+        if peek() == 'NOT':
+            position[0] += 1
+            return ('not', parse_not())
+        if peek() == '(':
+            position[0] += 1
+            node = parse_or()
+            if peek() == ')':
+                position[0] += 1
+            return node
+        token = peek()
+        position[0] += 1
+        return ('term', token.lower() if token else '')
+
+    if not tokens:
+        return None
+    return parse_or()
+
+# Fuzzy set model term correlations
+class FuzzySetIndex:
+    """
+    Thresholded term-term correlations and fuzzy memberships for the fuzzy set model.
+
+    Correlations c(i, l) = n(i, l) / (n(i) + n(l) - n(i, l)) are counted over the
+    minterms of a GeneralizedVectorIndex, since every document in a minterm has
+    the same term set. Pairs below the threshold are dropped, and a document's
+    membership in a term's fuzzy set, 1 - prod(1 - c(i, l)) over its terms l,
+    is likewise shared by all documents of a minterm. The most recently used
+    `cache_size` correlation rows and fuzzy sets are kept.
+    """
+    def __init__(self, gvsm, threshold=0.1, cache_size=1024):
+        self.gvsm = gvsm
+        self.threshold = threshold
+        self.minterm_docs = [array('i') for _ in range(gvsm.num_minterms)]
+        for doc_id, minterm in enumerate(gvsm.doc_minterm):
+            self.minterm_docs[minterm].append(doc_id)
+        self.doc_freqs = array('i', (
+            sum(len(self.minterm_docs[minterm]) for minterm in minterms)
+            for minterms in gvsm.term_minterms
+        ))
+        self.correlation = lru_cache(maxsize=cache_size)(self._correlation)
+        self.membership = lru_cache(maxsize=cache_size)(self._membership)
+
+    def _correlation(self, term_id):
+        """Return the thresholded sparse correlation row {term ID: c(i, l)} for a term ID."""
+        co_counts = {}
+        for minterm in self.gvsm.term_minterms[term_id]:
+            count = len(self.minterm_docs[minterm])
+            for other_id in self.gvsm.minterm_terms[minterm]:
+                co_counts[other_id] = co_counts.get(other_id, 0) + count
+        row = {}
+        for other_id, n_il in co_counts.items():
+            corr = n_il / (self.doc_freqs[term_id] + self.doc_freqs[other_id] - n_il)
+            if corr >= self.threshold:
+                row[other_id] = corr
+        return row
+
+    def _membership(self, term):
+        """Return the fuzzy set {doc ID: membership} of a term."""
+        term_id = self.gvsm.term_ids.get(term)
+        complements = {}
+        if term_id is not None:
+            for other_id, corr in self.correlation(term_id).items():
+                for minterm in self.gvsm.term_minterms[other_id]:
+                    complements[minterm] = complements.get(minterm, 1.0) * (1.0 - corr)
+        members = {}
+        for minterm, complement in complements.items():
+            for doc_id in self.minterm_docs[minterm]:
+                members[doc_id] = 1.0 - complement
+        return members
+
+# Set-theoretic retrieval engine
+class SetTheoreticEngine:
+    """Index structures and ranking for the set-theoretic models, usable without the GUI."""
+    MODELS = (
+        "Generalized Vector Model",
+        "Boolean Model",
+        "Extended Boolean Model (p-norm)",
+        "Fuzzy Set Model"
+    )
+    BOOLEAN_MODELS = MODELS[1:]  # models that rank a parsed Boolean query tree
+    LAZY_INDEXES = {"Generalized Vector Model": ('gvsm',), "Fuzzy Set Model": ('fuzzy',)}
+
+    def __init__(self, base_dir='data', documents=None, doc_tokens=None):
+        """
+        documents optionally supplies an already open DocumentStore over base_dir,
+        and doc_tokens its documents already tokenized, in order.
+        """
+        # Initialize term-document structures
+        self.documents = {}
+        self.term_document_matrix = {}
+        self.doc_paths = []
+        self.postings = {}
+        self.term_bitmaps = {}
+        self.all_documents = CompressedBitmap()
+        self.p_norm = 2.0
+
+        # Load documents and build term-document matrix
+        if documents is None:
+            self.load_documents(base_dir)
+        else:
+            self.documents = documents
+        self.build_term_document_matrix(doc_tokens)
+        self.calculate_document_vectors()
+
+    def prepare(self, models):
+        """Build the indexes the given models use now instead of on their first query."""
+        for model in models:
+            for index in self.LAZY_INDEXES.get(model, ()):
+                getattr(self, index)
+
+    def rank(self, query, model="Generalized Vector Model"):
+        """Return [(doc, score), ...] for a query under one of MODELS, best first."""
+        with span('query-parse', model=model):
+            parsed = parse_boolean_query(query) if model in self.BOOLEAN_MODELS else self.tokenize(query)
+        with span('score', model=model):
+            if model == "Boolean Model":
+                scores = self.boolean_rank(parsed)
+            elif model == "Extended Boolean Model (p-norm)":
+                scores = self.pnorm_rank(parsed)
+            elif model == "Fuzzy Set Model":
+                scores = self.fuzzy_rank(parsed)
+            else:
+                scores = self.gvsm_rank(parsed)
+        with span('top-k', model=model):
+            return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+    def load_documents(self, base_dir):
+        """Open a lazily read document store over the data directory."""
+        self.documents = DocumentStore(base_dir)
+
+    def tokenize(self, text):
+        """Tokenize text into words."""
+        return re.findall(r'\w+', text.lower())
+
+    def build_term_document_matrix(self, doc_tokens=None):
+        """Build term-document matrix, from already tokenized documents if given."""
+        if doc_tokens is None:
+            doc_tokens = (self.tokenize(content) for content in self.documents.values())
+        for doc_path, tokens in zip(self.documents, doc_tokens):
+            for token in tokens:
+                if token not in self.term_document_matrix:
+                    self.term_document_matrix[token] = {}
+                if doc_path not in self.term_document_matrix[token]:
+                    self.term_document_matrix[token][doc_path] = 0
+                self.term_document_matrix[token][doc_path] += 1
+
+    def calculate_document_vectors(self):
+        """
+        Calculate normalized TF-IDF weights as compact postings arrays and the
+        Boolean models' bitmaps.
+
+        self.postings maps each term to (doc IDs, weights) arrays, where a doc ID
+        indexes self.doc_paths. The generalized vector space is only projected
+        when a GVSM or fuzzy query first needs it, see gvsm and fuzzy.
+        """
+        self.doc_paths = list(self.documents)
+        doc_ids = {doc: doc_id for doc_id, doc in enumerate(self.doc_paths)}
+        num_documents = len(self.doc_paths)
+        norms = array('d', bytes(8 * num_documents))
+        for term, doc_freqs in self.term_document_matrix.items():
+            idf = math.log(num_documents / len(doc_freqs))
+            ids = array('i', sorted(doc_ids[doc] for doc in doc_freqs))
+            weights = array('d', (doc_freqs[self.doc_paths[doc_id]] * idf for doc_id in ids))
+            for doc_id, weight in zip(ids, weights):
+                norms[doc_id] += weight ** 2
+            self.postings[term] = (ids, weights)
+
+        # Normalize document vectors
+        norms = array('d', (math.sqrt(value) for value in norms))
+        for ids, weights in self.postings.values():
+            for i, doc_id in enumerate(ids):
+                weights[i] = weights[i] / norms[doc_id] if norms[doc_id] else 0.0
+
+        # Compressed bitmaps of the term-document matrix for the Boolean models
+        self.term_bitmaps = {term: CompressedBitmap.from_ids(ids) for term, (ids, _) in self.postings.items()}
+        self.all_documents = CompressedBitmap.from_ids(range(num_documents))
+
+    @cached_property
+    def gvsm(self):
+        """Minterms, term vectors and document norms for the GVSM, built on first use."""
+        return GeneralizedVectorIndex(self.postings, len(self.doc_paths))
+
+    @cached_property
+    def fuzzy(self):
+        """Term-term correlations for the fuzzy set model, built on first use."""
+        return FuzzySetIndex(self.gvsm)
+
+    def gvsm_rank(self, tokens):
+        """Score documents with the Generalized Vector Space Model."""
+        query_vector = {}
+        num_documents = len(self.documents)
+
+        # Build query vector
+        for token in tokens:
+            if token in self.term_document_matrix:
+                idf = math.log(num_documents / len(self.term_document_matrix[token]))
+                query_vector[token] = idf
+
+        # Project the query onto correlated terms through the minterm space
+        expanded_query, query_norm = self.gvsm.expand_query(query_vector)
+
+        # Term-at-a-time accumulation over the postings of the expanded query
+        accumulators = {}
+        if query_norm:
+            for term, query_weight in expanded_query.items():
+                ids, weights = self.postings[term]
+                for doc_id, weight in zip(ids, weights):
+                    accumulators[doc_id] = accumulators.get(doc_id, 0.0) + query_weight * weight
+
+        # Calculate cosine similarity in the generalized vector space
+        scores = {}
+        doc_norms = self.gvsm.doc_norms
+        for doc_id, score in accumulators.items():
+            if score > 0 and doc_norms[doc_id]:
+                scores[self.doc_paths[doc_id]] = score / (doc_norms[doc_id] * query_norm)
+        return scores
+
+    def boolean_rank(self, tree):
+        """Match documents with the classic Boolean model over compressed bitmaps; tree is a parse_boolean_query result."""
+        if tree is None:
+            return {}
+        bitmap, negated = self.evaluate_boolean(tree)
+        if negated:
+            bitmap = self.all_documents - bitmap
+        return {self.doc_paths[doc_id]: 1.0 for doc_id in bitmap}
+
+    def evaluate_boolean(self, node):
+        """
+        Evaluate a Boolean query tree to (bitmap, negated), where negated means the
+        result is the complement of the bitmap. Complements are only materialized
+        against the full document set if they survive to the top of the tree.
+        """
+        kind = node[0]
+        if kind == 'term':
+            return self.term_bitmaps.get(node[1], CompressedBitmap()), False
+        if kind == 'not':
+            bitmap, negated = self.evaluate_boolean(node[1])
+            return bitmap, not negated
+        children = [self.evaluate_boolean(child) for child in node[1]]
+        positives = [bitmap for bitmap, negated in children if not negated]
+        negatives = [bitmap for bitmap, negated in children if negated]
+        if kind == 'and':
+            # A AND B AND NOT C AND NOT D = (A AND B) - (C OR D)
+            excluded = self.union(negatives)
+            if positives:
+                included = positives[0]
+                for bitmap in positives[1:]:
+                    included = included & bitmap
+                return included - excluded, False
+            return excluded, True
+        # A OR B OR NOT C OR NOT D = NOT ((C AND D) - (A OR B))
+        included = self.union(positives)
+        if negatives:
+            excluded = negatives[0]
+            for bitmap in negatives[1:]:
+                excluded = excluded & bitmap
+            return excluded - included, True
+        return included, False
+
+    def union(self, bitmaps):
+        """OR together a sequence of bitmaps."""
+        result = CompressedBitmap()
+        for bitmap in bitmaps:
+            result = result | bitmap
+        return result
+
+    def query_terms(self, node, include_negated=False):
+        """Collect the terms of a query tree, skipping negated subtrees unless asked not to."""
+        if node[0] == 'term':
+            return [node[1]]
+        if node[0] == 'not':
+            return self.query_terms(node[1], include_negated) if include_negated else []
+        return [term for child in node[1] for term in self.query_terms(child, include_negated)]
+
+    def pnorm_rank(self, tree):
+        """Score documents with the p-norm extended Boolean model; tree is a parse_boolean_query result."""
+        if tree is None:
+            return {}
+        weights = {}
+        for term in set(self.query_terms(tree, include_negated=True)):
+            if term in self.postings:
+                ids, values = self.postings[term]
+                weights[term] = dict(zip(ids, values))
+
+        # Only documents containing a non-negated term can score above a document
+        # with no query terms at all; that baseline is usually zero.
+        p = self.p_norm
+        if self.evaluate_pnorm(tree, -1, weights, p) > 0:
+            candidates = self.all_documents
+        else:
+            candidates = self.union(self.term_bitmaps[term] for term in self.query_terms(tree) if term in self.term_bitmaps)
+        scores = {}
+        for doc_id in candidates:
+            score = self.evaluate_pnorm(tree, doc_id, weights, p)
+            if score > 0:
+                scores[self.doc_paths[doc_id]] = score
+        return scores
+
+    def evaluate_pnorm(self, node, doc_id, weights, p):
+        kind = node[0]
+        if kind == 'term':
+            return weights.get(node[1], {}).get(doc_id, 0.0)
+        if kind == 'not':
+            return 1.0 - self.evaluate_pnorm(node[1], doc_id, weights, p)
+        values = [self.evaluate_pnorm(child, doc_id, weights, p) for child in node[1]]
+        if kind == 'and':
+            return 1.0 - (sum((1.0 - value) ** p for value in values) / len(values)) ** (1.0 / p)
+        return (sum(value ** p for value in values) / len(values)) ** (1.0 / p)
+
+    def fuzzy_rank(self, tree):
+        """Score documents with the fuzzy set model using algebraic sum and product; tree is a parse_boolean_query result."""
+        if tree is None:
+            return {}
+        members, default = self.evaluate_fuzzy(tree)
+        doc_ids = range(len(self.doc_paths)) if default > 0 else members
+        scores = {}
+        for doc_id in doc_ids:
+            value = members.get(doc_id, default)
+            if value > 0:
+                scores[self.doc_paths[doc_id]] = value
+        return scores
+
+    def evaluate_fuzzy(self, node):
+        """Evaluate a query tree to ({doc ID: membership}, membership of all other documents)."""
+        kind = node[0]
+        if kind == 'term':
+            return self.fuzzy.membership(node[1]), 0.0
+        if kind == 'not':
+            members, default = self.evaluate_fuzzy(node[1])
+            return {doc_id: 1.0 - value for doc_id, value in members.items()}, 1.0 - default
+        children = [self.evaluate_fuzzy(child) for child in node[1]]
+        doc_ids = set().union(*(members for members, _ in children))
+        if kind == 'and':
+            default = math.prod(default for _, default in children)
+            combined = {doc_id: math.prod(members.get(doc_id, d) for members, d in children) for doc_id in doc_ids}
+        else:
+            default = 1.0 - math.prod(1.0 - default for _, default in children)
+            combined = {doc_id: 1.0 - math.prod(1.0 - members.get(doc_id, d) for members, d in children) for doc_id in doc_ids}
+        return combined, default
@@ -2,22 +2,38 @@ import os
 import re
 import pickle
 import networkx as nx
+from collections import OrderedDict
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QSplitter, QTreeWidget, QTreeWidgetItem, QTextBrowser, QWidget, QGraphicsView, QGraphicsScene, QTreeWidgetItemIterator
+    QApplication, QMainWindow, QVBoxLayout, QSplitter, QTreeWidget, QTreeWidgetItem, QTextBrowser, QWidget, QGraphicsView, QGraphicsScene
 )
 from PyQt5.QtCore import Qt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from Link_Analysis import LinkPriors
 
-# Load content index
-def load_content_index(index_file):
+# Load the link index written by Indexer_Model
+LINK_INDEX_FILE = 'link_index2.pkl'
+LINK_PRIORS_FILE = 'link_priors2.pkl'
+LAYOUT_CACHE_SIZE = 256  # graph layouts kept, least recently used evicted first
+
+def load_link_index(index_file):
     """
-    Load the serialized content index from the file.
+    Load the precomputed document links (see Indexer_Model.build_link_index).
     """
     if os.path.exists(index_file):
         with open(index_file, 'rb') as f:
             return pickle.load(f)
-    return {}
+    return {'documents': [], 'links': {}, 'unique_terms': {}, 'unique_links': {}}
+
+def load_link_priors(priors_file):
+    """
+    Load the PageRank and HITS authority priors written by Indexer_Model, or (None, None).
+    """
+    if os.path.exists(priors_file):
+        with open(priors_file, 'rb') as f:
+            priors = pickle.load(f)
+        return LinkPriors(priors, 'pagerank'), LinkPriors(priors, 'authority')
+    return None, None
 
 class DocumentIRApp(QMainWindow):
     def __init__(self):
@@ -32,6 +48,9 @@ class DocumentIRApp(QMainWindow):
         self.file_tree = QTreeWidget()
         self.file_tree.setHeaderLabel("Documents")
         self.file_tree.itemClicked.connect(self.file_selected)
+        self.file_tree.itemExpanded.connect(self.populate_directory)
+        self.tree_items = {}  # normalized path -> tree item, for directories and files shown so far
+        self.populated_dirs = set()
         splitter.addWidget(self.file_tree)
 
         # Content display pane
@@ -44,6 +63,14 @@ class DocumentIRApp(QMainWindow):
         self.graph_view = QGraphicsView()
         self.graph_scene = QGraphicsScene()
         self.graph_view.setScene(self.graph_scene)
+        # One figure and canvas reused for every graph (not registered with pyplot, so nothing accumulates)
+        self.figure = Figure(figsize=(8, 6))
+        self.graph_axes = self.figure.add_subplot(111)
+        self.canvas = FigureCanvas(self.figure)
+        self.canvas.setGeometry(0, 0, 800, 600)
+        self.graph_scene.addWidget(self.canvas)
+        self.layout_cache = OrderedDict()  # graph hash -> node positions
+        self.last_positions = {}
         splitter.addWidget(self.graph_view)
         splitter.setStretchFactor(2, 3)
         splitter.setStretchFactor(1, 3)
@@ -58,42 +85,71 @@ class DocumentIRApp(QMainWindow):
         # Load documents into tree
         self.load_file_tree('data')
 
-        # Load content index for linking
-        self.content_index = load_content_index('content_index.pkl')
+        # Load precomputed links: doc ID -> {term: target doc ID}
+        self.link_index = load_link_index(LINK_INDEX_FILE)
+        self.documents = self.link_index['documents']
+        self.doc_ids = {path: doc_id for doc_id, path in enumerate(self.documents)}
+        self.pagerank, self.authority = load_link_priors(LINK_PRIORS_FILE)
 
     def load_file_tree(self, base_dir):
         """
-        Load files and folders into the tree view.
+        Add the root folder to the tree view; sub-folders are scanned when expanded.
         """
+        self.base_dir = base_dir
         base_item = QTreeWidgetItem(self.file_tree, [os.path.basename(base_dir)])
         base_item.setData(0, Qt.UserRole, base_dir)
+        base_item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+        self.tree_items[os.path.normpath(base_dir)] = base_item
 
-        for root, dirs, files in os.walk(base_dir):
-            current_item = base_item
-            if root != base_dir:
-                relative_path = os.path.relpath(root, base_dir)
-                path_parts = relative_path.split(os.sep)
-                for part in path_parts:
-                    found_item = None
-                    for i in range(current_item.childCount()):
-                        if current_item.child(i).text(0) == part:
-                            found_item = current_item.child(i)
-                            break
-                    if not found_item:
-                        found_item = QTreeWidgetItem(current_item, [part])
-                        found_item.setData(0, Qt.UserRole, os.path.join(base_dir, relative_path))
-                    current_item = found_item
-
-            for file in files:
-                if file.endswith('.txt'):
-                    file_item = QTreeWidgetItem(current_item, [file])
-                    file_item.setData(0, Qt.UserRole, os.path.join(root, file))
+    def populate_directory(self, item):
+        """
+        Add the sub-folders and .txt files of a folder item the first time it is expanded.
+        """
+        dir_path = item.data(0, Qt.UserRole)
+        key = os.path.normpath(dir_path)
+        if key in self.populated_dirs or not os.path.isdir(dir_path):
+            return
+        self.populated_dirs.add(key)
+
+        with os.scandir(dir_path) as entries:
+            entries = sorted(entries, key=lambda entry: (not entry.is_dir(), entry.name))
+        for entry in entries:
+            if entry.is_dir():
+                child = QTreeWidgetItem(item, [entry.name])
+                child.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            elif entry.name.endswith('.txt'):
+                child = QTreeWidgetItem(item, [entry.name])
+            else:
+                continue
+            path = os.path.join(dir_path, entry.name)
+            child.setData(0, Qt.UserRole, path)
+            self.tree_items[os.path.normpath(path)] = child
+        if not item.childCount():
+            item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
+
+    def find_tree_item(self, path):
+        """
+        Return the tree item for a path, populating only the folders on the way to it.
+        """
+        key = os.path.normpath(path)
+        if key in self.tree_items:
+            return self.tree_items[key]
+        relative_path = os.path.relpath(key, os.path.normpath(self.base_dir))
+        if relative_path.startswith(os.pardir):
+            return None
+        current = os.path.normpath(self.base_dir)
+        for part in relative_path.split(os.sep)[:-1]:
+            self.populate_directory(self.tree_items[current])
+            current = os.path.join(current, part)
+            if current not in self.tree_items:
+                return None
+        self.populate_directory(self.tree_items[current])
+        return self.tree_items.get(key)
 
     def file_selected(self, item, column):
         """
         Handle file selection from the tree view.
         """
-        print(item)
         file_path = item.data(0, Qt.UserRole)
         if os.path.isfile(file_path):
             self.display_file_content(file_path)
@@ -106,26 +162,32 @@ class DocumentIRApp(QMainWindow):
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             document_name = os.path.basename(file_path)
-            linked_content = f"<b>{document_name}</b><br><br>"  # Display document name in bold
-            # Add links for terms based on content index
+            doc_id = self.doc_ids.get(file_path)
+            links = self.link_index['links'].get(doc_id, {})
+            unique_terms = self.link_index['unique_terms']
+            segments = [f"<b>{document_name}</b>"]  # Display document name in bold
+            if self.pagerank is not None:
+                segments.append(f" (PageRank {self.pagerank.get(file_path):.3f}, authority {self.authority.get(file_path):.3f})")
+            segments.append("<br><br>")
+            # Add links for terms that occur in exactly one other document
             graph_data = []
             for line in content.splitlines():
                 for word in re.findall(r'\w+', line):
                     word_lower = word.lower()
-                    if word_lower in self.content_index:
-                        # Use a set to ensure unique documents
-                        linked_docs = {doc[0] for doc in self.content_index[word_lower] if doc[0] != file_path}
-                        if len(linked_docs) == 1:  # Link if the word appears in exactly one other document
-                            linked_file_path = next(iter(linked_docs))  # Get the other document's path
-                            linked_content += f"<a href='{linked_file_path}'>{word}</a> "
-                            graph_data.append((word_lower, linked_docs))
-                        else:
-                            linked_content += word + " "
+                    target = links.get(word_lower)
+                    if target is None:
+                        target = unique_terms.get(word_lower)
+                        if target == doc_id:
+                            target = None
+                    if target is not None:
+                        linked_file_path = self.documents[target]
+                        segments.append(f"<a href='{linked_file_path}'>{word}</a> ")
+                        graph_data.append((word_lower, {linked_file_path}))
                     else:
-                        linked_content += word + " "
-                linked_content += "<br>"
+                        segments.append(word + " ")
+                segments.append("<br>")
 
-            self.result_display.setHtml(linked_content)
+            self.result_display.setHtml(''.join(segments))
 
             # Plot the graph if there are terms to visualize
             if graph_data:
@@ -139,26 +201,17 @@ class DocumentIRApp(QMainWindow):
         Handle clicks on links to show the linked document.
         """
         linked_file_path = url.toString().replace("%5C", '\\')
-        # print(linked_file_path)
-        # print(linked_file_path)
         if os.path.isfile(linked_file_path):
-            iterator = QTreeWidgetItemIterator(self.file_tree)
-            while iterator.value():
-                item = iterator.value()
-                print(item.data(0, Qt.UserRole))
-                if item.data(0, Qt.UserRole) == linked_file_path:
-                    print('imitating click')
-                    self.file_tree.itemClicked.emit(item, 0)  # Imitate the itemClicked event
-                    return
-                iterator += 1
+            item = self.find_tree_item(linked_file_path)
+            if item is not None:
+                self.file_tree.setCurrentItem(item)
+                self.file_tree.scrollToItem(item)
+                self.file_selected(item, 0)
 
     def plot_graph(self, graph_data):
         """
         Plot the graph showing connections between files that share the term.
         """
-        # Clear the existing graph
-        self.graph_scene.clear()
-
         # Create a graph object
         G = nx.Graph()
 
@@ -169,15 +222,27 @@ class DocumentIRApp(QMainWindow):
                 G.add_node(term, color='red')  # Add the term as a separate node
                 G.add_edge(term, file_name)
 
-        # Draw the graph using matplotlib
-        fig, ax = plt.subplots(figsize=(8, 6))
-        pos = nx.spring_layout(G)
+        # Reuse the layout of an identical graph, otherwise seed it from the previous one
+        graph_hash = hash(frozenset(frozenset(edge) for edge in G.edges))
+        pos = self.layout_cache.get(graph_hash)
+        if pos is None:
+            seed_pos = {node: self.last_positions[node] for node in G if node in self.last_positions}
+            if seed_pos:
+                pos = nx.spring_layout(G, pos=seed_pos, iterations=20, seed=0)
+            else:
+                pos = nx.spring_layout(G, seed=0)
+            self.layout_cache[graph_hash] = pos
+            if len(self.layout_cache) > LAYOUT_CACHE_SIZE:
+                self.layout_cache.popitem(last=False)
+        else:
+            self.layout_cache.move_to_end(graph_hash)
+        self.last_positions = pos
+
+        # Redraw on the shared canvas
+        ax = self.graph_axes
+        ax.clear()
         nx.draw(G, pos, with_labels=True, ax=ax, node_color=["red" if G.nodes[n].get("color") == "red" else "lightblue" for n in G.nodes], node_size=2000, font_size=10, font_weight="bold")
-
-        # Render the graph in the QGraphicsView
-        canvas = FigureCanvas(fig)
-        canvas.setGeometry(0, 0, 800, 600)
-        self.graph_scene.addWidget(canvas)
+        self.canvas.draw_idle()
 
 if __name__ == "__main__":
     app = QApplication([])
@@ -0,0 +1,499 @@
+import os
+import re
+import csv
+import random
+from array import array
+from collections import deque
+from functools import cached_property
+from Proximity_Graph import generate_proximal_nodes
+from Binary_Independence_Model import BinaryIndependenceModel
+from Document_Store import DocumentStore
+from Instrumentation import span
+
+# Non-nouns and noun suffixes for filtering
+NON_NOUNS = {
+    'the', 'is', 'am', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
+    'and', 'or', 'but', 'if', 'while', 'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 'through',
+    'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over',
+    'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'any',
+    'both', 'each', 'few', 'more', 'some', 'such', 'no', 'nor', 'too', 'very', 'can', 'will', 'just', 'should',
+    'would', 'could', 'might', 'must', 'not', 'he', 'she', 'it'
+}
+NOUN_SUFFIXES = ('tion', 'ment', 'ness', 'ity', 'ance', 'ence', 'ship', 'age', 'hood', 'ism', 'ist', 'cy', 'dom')
+
+# Multi-phrase matcher
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over word tokens, built once from a phrase list.
+
+    match() walks a token list once and returns {start: length} for the longest
+    phrase starting at each position, so recognizing phrases costs one pass over
+    the document no matter how many phrases are configured.
+    """
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for phrase in phrases:
+            words = re.findall(r'\w+', phrase.lower())
+            if not words:
+                continue
+            state = 0
+            for word in words:
+                next_state = self.goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][word] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(len(words))
+
+        # Breadth-first pass for failure links; outputs include those of the fallback state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(word, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def match(self, tokens):
+        starts = {}
+        state = 0
+        for end, token in enumerate(tokens, 1):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            for length in self.output[state]:
+                start = end - length
+                if length > starts.get(start, 0):
+                    starts[start] = length
+        return starts
+
+# Preprocessing function
+def preprocess_text(text, phrases=None):
+    """Tokenize, remove stopwords, and preserve phrases (a PhraseMatcher or a list of phrases)."""
+    if phrases is None:
+        phrases = []
+    matcher = phrases if isinstance(phrases, PhraseMatcher) else PhraseMatcher(phrases)
+    return preprocess_tokens(re.findall(r'\w+', text.lower()), matcher)
+
+def preprocess_tokens(words, matcher):
+    """preprocess_text for text already split into lowercase words."""
+    phrase_starts = matcher.match(words)
+
+    # Keep the leftmost-longest phrase at each position as a single term
+    processed = []
+    i = 0
+    while i < len(words):
+        length = phrase_starts.get(i)
+        if length:
+            processed.append(' '.join(words[i:i + length]))
+            i += length
+            continue
+        if words[i] not in NON_NOUNS:
+            processed.append(words[i].replace('_', ' '))
+        i += 1
+    return processed
+
+# Load and preprocess documents
+def load_documents(directory, phrases=None):
+    documents = {}
+    matcher = phrases if isinstance(phrases, PhraseMatcher) else PhraseMatcher(phrases or [])
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith('.txt'):
+                file_path = os.path.join(root, file)
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                    documents[file_path] = preprocess_text(text, matcher)
+    return documents
+
+# Inverted index shared by the non-overlapped list and proximal nodes models
+def build_postings_index(documents):
+    """Map each term to the set of document paths containing it; documents yields (path, terms) pairs."""
+    postings = {}
+    for doc_path, content in documents:
+        for term in set(content):
+            if term not in postings:
+                postings[term] = set()
+            postings[term].add(doc_path)
+    return postings
+
+# Non-Overlapped List Model
+def non_overlapped_retrieve(query, postings):
+    retrieved_docs = set()
+    for term in query:
+        retrieved_docs.update(postings.get(term, ()))
+    return list(retrieved_docs)
+
+# Proximal Nodes Model
+def proximal_nodes_retrieve_dynamic(query, postings, proximity_graph):
+    """Rank documents by the summed weights of the query terms' proximal nodes."""
+    with span('score', model="Proximal Nodes Model"):
+        related_terms = {}
+        for term in query:
+            for neighbor, weight in proximity_graph.neighbors(term):
+                related_terms[neighbor] = related_terms.get(neighbor, 0.0) + weight
+        scores = {}
+        for term, weight in related_terms.items():
+            for doc_path in postings.get(term, ()):
+                scores[doc_path] = scores.get(doc_path, 0.0) + weight
+    with span('top-k', model="Proximal Nodes Model"):
+        return sorted(scores, key=scores.get, reverse=True)
+
+# MinHash signatures and banded LSH for Jaccard candidate generation
+MERSENNE_PRIME = (1 << 61) - 1
+
+class MinHashLSH:
+    """
+    MinHash signatures of document term sets, bucketed by band for LSH.
+
+    Two sets with Jaccard similarity s share at least one band bucket with
+    probability 1 - (1 - s^rows)^bands, so candidates() only returns documents
+    that are likely to be similar instead of the whole corpus.
+    """
+    def __init__(self, num_perm=64, bands=16, seed=1):
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = {}
+
+    def signature(self, terms):
+        """Return the MinHash signature of a set of terms, or None for an empty set."""
+        hashes = [hash(term) & MERSENNE_PRIME for term in terms]
+        if not hashes:
+            return None
+        return array('Q', (min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.permutations))
+
+    def band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def add(self, key, terms):
+        signature = self.signature(terms)
+        if signature is None:
+            return
+        self.signatures[key] = signature
+        for band, band_key in self.band_keys(signature):
+            self.buckets[band].setdefault(band_key, []).append(key)
+
+    def candidates(self, terms=None, signature=None):
+        """Return the keys sharing at least one band bucket with a term set or signature."""
+        if signature is None:
+            signature = self.signature(terms)
+        if signature is None:
+            return set()
+        found = set()
+        for band, band_key in self.band_keys(signature):
+            found.update(self.buckets[band].get(band_key, ()))
+        return found
+
+def build_minhash_index(documents, num_perm=64, bands=16):
+    """Precompute each document's term set and MinHash signature; documents yields (path, terms) pairs."""
+    doc_term_sets = {doc_path: frozenset(content) for doc_path, content in documents}
+    lsh = MinHashLSH(num_perm, bands)
+    for doc_path, terms in doc_term_sets.items():
+        lsh.add(doc_path, terms)
+    return doc_term_sets, lsh
+
+def rank_by_jaccard(query_terms, candidates, doc_term_sets):
+    with span('score', model="Jaccard Model"):
+        rankings = []
+        for doc_path in candidates:
+            doc_terms = doc_term_sets[doc_path]
+            intersection = len(query_terms & doc_terms)
+            union = len(query_terms | doc_terms)
+            jaccard_score = intersection / union if union != 0 else 0
+            if jaccard_score > 0:
+                rankings.append((doc_path, jaccard_score))
+    with span('top-k', model="Jaccard Model"):
+        return sorted(rankings, key=lambda x: x[1], reverse=True)
+
+# Jaccard Model
+def jaccard_retrieve(query, doc_term_sets, lsh, postings):
+    """
+    Rank documents by exact Jaccard similarity, scoring only LSH candidates.
+
+    A short query is rarely similar enough to a whole document to share an LSH
+    bucket, so when LSH finds nothing the documents containing a query term
+    (the only ones with a non-zero score) are used as candidates instead.
+    """
+    query_terms = frozenset(query)
+    candidates = lsh.candidates(query_terms)
+    if not candidates:
+        for term in query_terms:
+            candidates.update(postings.get(term, ()))
+    return rank_by_jaccard(query_terms, candidates, doc_term_sets)
+
+# Binary Independence Model (BIM)
+def bim_retrieve(query, bim, relevant_docs=None):
+    """Rank documents with precomputed RSJ term weights, re-estimated from relevant_docs if given."""
+    return bim.retrieve(query, relevant_docs)
+
+# More Like This
+def more_like_this(doc_path, doc_term_sets, lsh):
+    """Rank the documents most similar to a given document by Jaccard similarity over LSH candidates."""
+    signature = lsh.signatures.get(doc_path)
+    if signature is None:
+        return []
+    candidates = lsh.candidates(signature=signature) - {doc_path}
+    return rank_by_jaccard(doc_term_sets[doc_path], candidates, doc_term_sets)
+
+# Region index for structured queries
+SECTION_HEADING = re.compile(r'^\s*(#+\s*\S.*|(?=[0-9 \-:]*[A-Z])[A-Z0-9][A-Z0-9 \-:]{2,})$')  # all-caps lines need a letter
+
+class RegionIndex:
+    """
+    Positional postings plus structural regions stored as intervals per document.
+
+    Text documents get 'line', 'paragraph' (blank-line separated) and 'section'
+    (started by a '#' or all-caps heading line) regions; CSV files get 'row' and
+    'column' regions. Each region type of a document is kept as sorted arrays of
+    token start/end positions and region IDs, so mapping a term's positions to
+    regions is a merge join of two sorted lists rather than a rescan of the text.
+    """
+    TEXT_REGIONS = ('line', 'paragraph', 'section')
+    CSV_REGIONS = ('row', 'column')
+
+    def __init__(self):
+        self.positions = {}
+        self.regions = {}
+
+    def add_token(self, term, doc_path, position):
+        if term not in self.positions:
+            self.positions[term] = {}
+        if doc_path not in self.positions[term]:
+            self.positions[term][doc_path] = array('i')
+        self.positions[term][doc_path].append(position)
+
+    def add_region(self, doc_path, region_type, start, end, region_id):
+        """Record tokens [start, end) of a document as part of a region; intervals must be added in order."""
+        if start >= end:
+            return
+        doc_regions = self.regions.setdefault(doc_path, {})
+        if region_type not in doc_regions:
+            doc_regions[region_type] = (array('i'), array('i'), array('i'))
+        starts, ends, ids = doc_regions[region_type]
+        starts.append(start)
+        ends.append(end)
+        ids.append(region_id)
+
+    def term_regions(self, term, region_type):
+        """Return {doc path: set of region IDs} for the regions of region_type that contain the term."""
+        found = {}
+        for doc_path, positions in self.positions.get(term, {}).items():
+            intervals = self.regions.get(doc_path, {}).get(region_type)
+            if intervals is None:
+                continue
+            starts, ends, ids = intervals
+            region_ids = set()
+            i = 0
+            for position in positions:
+                # Positions and intervals are both sorted, so the cursor only moves forward
+                while i < len(starts) and ends[i] <= position:
+                    i += 1
+                if i < len(starts) and starts[i] <= position:
+                    region_ids.add(ids[i])
+            if region_ids:
+                found[doc_path] = region_ids
+        return found
+
+    def same_region(self, terms, region_type):
+        """Return {doc path: number of regions of region_type containing every term}."""
+        if not terms:
+            return {}
+        shared = self.term_regions(terms[0], region_type)
+        for term in terms[1:]:
+            regions = self.term_regions(term, region_type)
+            shared = {doc: ids & regions[doc] for doc, ids in shared.items() if doc in regions}
+        return {doc: len(ids) for doc, ids in shared.items() if ids}
+
+def build_region_index(directory, phrases=None):
+    """Index token positions and line/paragraph/section or row/column regions for .txt and .csv files."""
+    matcher = phrases if isinstance(phrases, PhraseMatcher) else PhraseMatcher(phrases or [])
+    region_index = RegionIndex()
+    for root, _, files in os.walk(directory):
+        for file in files:
+            file_path = os.path.join(root, file)
+            if file.endswith('.txt'):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    index_text_regions(region_index, file_path, f, matcher)
+            elif file.endswith('.csv'):
+                with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                    index_csv_regions(region_index, file_path, f, matcher)
+    return region_index
+
+def index_text_regions(region_index, doc_path, lines, matcher):
+    position = 0
+    line_id = 0
+    paragraph = [0, 0]
+    section = [0, 0]
+    for line in lines:
+        if not line.strip():
+            # A blank line closes the current paragraph
+            region_index.add_region(doc_path, 'paragraph', paragraph[0], position, paragraph[1])
+            paragraph = [position, paragraph[1] + 1]
+            continue
+        if SECTION_HEADING.match(line.rstrip('\n')) and position > section[0]:
+            region_index.add_region(doc_path, 'paragraph', paragraph[0], position, paragraph[1])
+            region_index.add_region(doc_path, 'section', section[0], position, section[1])
+            paragraph = [position, paragraph[1] + 1]
+            section = [position, section[1] + 1]
+        start = position
+        for term in preprocess_text(line, matcher):
+            region_index.add_token(term, doc_path, position)
+            position += 1
+        region_index.add_region(doc_path, 'line', start, position, line_id)
+        line_id += 1
+    region_index.add_region(doc_path, 'paragraph', paragraph[0], position, paragraph[1])
+    region_index.add_region(doc_path, 'section', section[0], position, section[1])
+
+def index_csv_regions(region_index, doc_path, lines, matcher):
+    position = 0
+    for row_id, row in enumerate(csv.reader(lines)):
+        row_start = position
+        for column, cell in enumerate(row):
+            cell_start = position
+            for term in preprocess_text(cell, matcher):
+                region_index.add_token(term, doc_path, position)
+                position += 1
+            region_index.add_region(doc_path, 'column', cell_start, position, column)
+        region_index.add_region(doc_path, 'row', row_start, position, row_id)
+
+# Structured Region Model
+def structured_retrieve(query, region_index, matcher):
+    """
+    Rank documents by how many regions contain all query terms together.
+
+    The region type is given with '@', e.g. 'cat dog @paragraph'; it defaults to
+    paragraph. Documents without that region type (e.g. CSV files for paragraph)
+    never match. Raises ValueError for a region type no document can have.
+    """
+    with span('query-parse', model="Structured Region Model"):
+        region_types = re.findall(r'@(\w+)', query)
+        region_type = region_types[-1].lower() if region_types else 'paragraph'
+        known = RegionIndex.TEXT_REGIONS + RegionIndex.CSV_REGIONS
+        if region_type not in known:
+            raise ValueError(f"unknown region type '@{region_type}'; use one of {', '.join('@' + name for name in known)}")
+        terms = list(dict.fromkeys(preprocess_text(re.sub(r'@\w+', ' ', query), matcher)))
+    with span('score', model="Structured Region Model"):
+        counts = region_index.same_region(terms, region_type)
+    with span('top-k', model="Structured Region Model"):
+        return sorted(counts.items(), key=lambda x: x[1], reverse=True)
+
+# Retrieval engine over all of the above, shared by the GUI and headless tools
+class StructuralEngine:
+    """
+    Ranks the documents of a directory with rank(query, model) under the models above.
+
+    Documents are analyzed once into arrays of term IDs (phrases joined, stop
+    words dropped), and each model's index is built from them the first time
+    that model is used. Only the region index of the structured model reads
+    the files again, since it needs their lines and CSV cells. Models that only
+    return an ordered (or unordered) list of documents get rank-based (or
+    equal) scores so every model returns [(doc, score), ...].
+    """
+    MODELS = (
+        "Binary Independence Model", "Jaccard Model", "Non-Overlapped List Model",
+        "Proximal Nodes Model", "Structured Region Model"
+    )
+    PHRASES = ["machine learning", "data visualization"]
+    LAZY_INDEXES = {
+        "Binary Independence Model": ('bim',), "Jaccard Model": ('postings', 'minhash_index'),
+        "Non-Overlapped List Model": ('postings',), "Proximal Nodes Model": ('postings', 'proximity_graph'),
+        "Structured Region Model": ('region_index',)
+    }
+
+    def __init__(self, base_dir='data', phrases=None, documents=None, doc_tokens=None):
+        """
+        documents optionally supplies an already open {path: text} store over base_dir,
+        and doc_tokens its documents already split into lowercase words, in order.
+        """
+        self.base_dir = base_dir
+        self.phrase_matcher = PhraseMatcher(self.PHRASES if phrases is None else phrases)
+        if documents is None:
+            documents = DocumentStore(base_dir)
+        if doc_tokens is None:
+            doc_tokens = (re.findall(r'\w+', text.lower()) for text in documents.values())
+        self.doc_paths = list(documents)
+        self.terms = []
+        self.term_ids = {}
+        self.doc_terms = []
+        for tokens in doc_tokens:
+            ids = array('i')
+            for term in preprocess_tokens(tokens, self.phrase_matcher):
+                term_id = self.term_ids.get(term)
+                if term_id is None:
+                    term_id = self.term_ids[term] = len(self.terms)
+                    self.terms.append(term)
+                ids.append(term_id)
+            self.doc_terms.append(ids)
+
+    def term_lists(self):
+        """Yield (path, [terms]) for every document."""
+        terms = self.terms
+        for doc_path, ids in zip(self.doc_paths, self.doc_terms):
+            yield doc_path, [terms[term_id] for term_id in ids]
+
+    @cached_property
+    def postings(self):
+        return build_postings_index(self.term_lists())
+
+    @cached_property
+    def bim(self):
+        return BinaryIndependenceModel(self.postings, len(self.doc_paths))
+
+    @cached_property
+    def minhash_index(self):
+        """(doc term sets, MinHashLSH) for the Jaccard model and more_like_this."""
+        return build_minhash_index(self.term_lists())
+
+    @cached_property
+    def proximity_graph(self):
+        return generate_proximal_nodes(terms for _, terms in self.term_lists())
+
+    @cached_property
+    def region_index(self):
+        return build_region_index(self.base_dir, self.phrase_matcher)
+
+    def prepare(self, models):
+        """Build the indexes the given models use now instead of on their first query."""
+        for model in models:
+            for index in self.LAZY_INDEXES.get(model, ()):
+                getattr(self, index)
+
+    def rank(self, query, model="Binary Independence Model", relevant_docs=None):
+        """
+        Return [(doc, score), ...] for a query under one of MODELS, best first.
+
+        Scoring and top-k selection are timed inside each model's function.
+        """
+        if model == "Structured Region Model":
+            return structured_retrieve(query, self.region_index, self.phrase_matcher)
+        with span('query-parse', model=model):
+            query_terms = preprocess_text(query, self.phrase_matcher)
+        if model == "Binary Independence Model":
+            return bim_retrieve(query_terms, self.bim, relevant_docs)
+        if model == "Jaccard Model":
+            return jaccard_retrieve(query_terms, *self.minhash_index, self.postings)
+        if model == "Non-Overlapped List Model":
+            with span('score', model=model):
+                return [(doc, 1.0) for doc in non_overlapped_retrieve(query_terms, self.postings)]
+        if model == "Proximal Nodes Model":
+            ranked = proximal_nodes_retrieve_dynamic(query_terms, self.postings, self.proximity_graph)
+            return [(doc, float(len(ranked) - rank)) for rank, doc in enumerate(ranked)]
+        return []
+
+    def more_like_this(self, doc_path):
+        return more_like_this(doc_path, *self.minhash_index)
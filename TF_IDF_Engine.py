@@ -0,0 +1,88 @@
+import re
+import math
+from Document_Store import DocumentStore
+from Instrumentation import span
+
+# Non-nouns and noun suffixes for filtering
+NON_NOUNS = {
+    'the', 'is', 'am', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
+    'and', 'or', 'but', 'if', 'while', 'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 'through',
+    'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over',
+    'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'any',
+    'both', 'each', 'few', 'more', 'some', 'such', 'no', 'nor', 'too', 'very', 'can', 'will', 'just', 'should',
+    'would', 'could', 'might', 'must', 'not', 'he', 'she', 'it'
+}
+NOUN_SUFFIXES = ('tion', 'ment', 'ness', 'ity', 'ance', 'ence', 'ship', 'age', 'hood', 'ism', 'ist', 'cy', 'dom')
+
+# Preprocessing to extract nouns
+def preprocess_text(text):
+    words = re.findall(r'\w+', text)
+    nouns = [
+        word.lower() for word in words
+        if word.lower() not in NON_NOUNS and (word[0].isupper() or word.lower().endswith(NOUN_SUFFIXES))
+    ]
+    return ' '.join(nouns)
+
+# Load documents from a directory (nouns are extracted when a document is first read)
+def load_documents(directory):
+    return DocumentStore(directory, transform=preprocess_text)
+
+# Term and inverse document frequencies
+def compute_tf(doc_terms):
+    term_counts = {}
+    total_terms = len(doc_terms)
+    for term in doc_terms:
+        term_counts[term] = term_counts.get(term, 0) + 1
+    return {term: count / total_terms for term, count in term_counts.items()}
+def compute_idf(documents):
+    num_docs = len(documents)
+    term_document_counts = {}
+    for doc_terms in documents:
+        for term in set(doc_terms):
+            term_document_counts[term] = term_document_counts.get(term, 0) + 1
+    return {term: math.log(num_docs / (1 + count)) for term, count in term_document_counts.items()}
+
+# Search engine with idf and document vectors computed once
+class TfIdfEngine:
+    """
+    TF-IDF cosine ranking over {path: noun text} documents (see load_documents).
+
+    The idf table and the sparse tf-idf vector and norm of every document are
+    computed when the engine is built, so a query costs one pass over the
+    postings of its terms. Every document is returned, as before, with the
+    documents that share no term with the query scored 0.
+    """
+    def __init__(self, documents):
+        self.doc_ids = list(documents)
+        doc_tokens = [documents[doc].split() for doc in self.doc_ids]
+        self.idf = compute_idf(doc_tokens)
+        self.postings = {}
+        self.doc_norms = []
+        for doc_index, tokens in enumerate(doc_tokens):
+            vector = {term: tf * self.idf[term] for term, tf in compute_tf(tokens).items()}
+            self.doc_norms.append(sum(weight ** 2 for weight in vector.values()) ** 0.5)
+            for term, weight in vector.items():
+                self.postings.setdefault(term, []).append((doc_index, weight))
+
+    def search(self, query):
+        with span('query-parse', model='TF-IDF'):
+            query_terms = query.lower().split()
+            query_tf = compute_tf(query_terms)
+            query_vector = {term: tf * self.idf[term] for term, tf in query_tf.items() if term in self.idf}
+            query_norm = sum(weight ** 2 for weight in query_vector.values()) ** 0.5
+        with span('score', model='TF-IDF'):
+            dot_products = {}
+            for term, query_weight in query_vector.items():
+                for doc_index, weight in self.postings[term]:
+                    dot_products[doc_index] = dot_products.get(doc_index, 0.0) + query_weight * weight
+            scores = [
+                (doc, dot_products.get(doc_index, 0.0) / (query_norm * self.doc_norms[doc_index])
+                 if query_norm and self.doc_norms[doc_index] else 0.0)
+                for doc_index, doc in enumerate(self.doc_ids)
+            ]
+        with span('top-k', model='TF-IDF'):
+            return sorted(scores, key=lambda x: x[1], reverse=True)
+
+# Search function
+def search(query, documents):
+    return TfIdfEngine(documents).search(query)
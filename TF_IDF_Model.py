@@ -1,99 +1,9 @@
 import os
-import re
 import time
 from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QDialog, QLineEdit, QTextBrowser, QPushButton, QWidget
 from PyQt5.QtCore import QUrl
-import math
-
-# Non-nouns and noun suffixes for filtering
-NON_NOUNS = {
-    'the', 'is', 'am', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
-    'and', 'or', 'but', 'if', 'while', 'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 'through',
-    'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over',
-    'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'any',
-    'both', 'each', 'few', 'more', 'some', 'such', 'no', 'nor', 'too', 'very', 'can', 'will', 'just', 'should',
-    'would', 'could', 'might', 'must', 'not', 'he', 'she', 'it'
-}
-NOUN_SUFFIXES = ('tion', 'ment', 'ness', 'ity', 'ance', 'ence', 'ship', 'age', 'hood', 'ism', 'ist', 'cy', 'dom')
-
-# Preprocessing to extract nouns
-def preprocess_text(text):
-    words = re.findall(r'\w+', text)
-    nouns = [
-        word.lower() for word in words
-        if word.lower() not in NON_NOUNS and (word[0].isupper() or word.lower().endswith(NOUN_SUFFIXES))
-    ]
-    return ' '.join(nouns)
-
-# Load documents from a directory
-def load_documents(directory):
-    documents = {}
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.txt'):
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    documents[file_path] = preprocess_text(f.read())
-    return documents
-
-# TF-IDF and cosine similarity ranking
-def compute_tf(doc_terms):
-    term_counts = {}
-    total_terms = len(doc_terms)
-    for term in doc_terms:
-        term_counts[term] = term_counts.get(term, 0) + 1
-    return {term: count / total_terms for term, count in term_counts.items()}
-def compute_idf(documents):
-    num_docs = len(documents)
-    term_document_counts = {}
-    for doc_terms in documents:
-        for term in set(doc_terms):
-            term_document_counts[term] = term_document_counts.get(term, 0) + 1
-    return {term: math.log(num_docs / (1 + count)) for term, count in term_document_counts.items()}
-def compute_tf_idf_matrix(documents, idf):
-    return [
-        {term: tf.get(term, 0) * idf.get(term, 0) for term in idf}
-        for tf in (compute_tf(doc) for doc in documents)
-    ]
-def cosine_similarity(vec1, vec2):
-    dot_product = sum(vec1.get(term, 0) * vec2.get(term, 0) for term in vec1)
-    magnitude1 = sum(weight ** 2 for weight in vec1.values()) ** 0.5
-    magnitude2 = sum(weight ** 2 for weight in vec2.values()) ** 0.5
-    return dot_product / (magnitude1 * magnitude2) if magnitude1 and magnitude2 else 0.0
-
-# Search function
-def search(query, documents):
-    query_terms = query.lower().split()
-    doc_tokens = [doc.split() for doc in documents.values()]
-    idf = compute_idf(doc_tokens)
-    tf_idf_matrix = compute_tf_idf_matrix(doc_tokens, idf)
-    query_tf_idf = {term: compute_tf(query_terms).get(term, 0) * idf.get(term, 0) for term in idf}
-    return sorted(
-        [(doc, cosine_similarity(query_tf_idf, tf_idf)) for doc, tf_idf in zip(documents.keys(), tf_idf_matrix)],
-        key=lambda x: x[1],
-        reverse=True
-    )
-
-# Document Content Viewer
-class DocumentViewer(QDialog):
-    def __init__(self, file_path):
-        super().__init__()
-        self.setWindowTitle(os.path.basename(file_path))
-        self.resize(800, 600)
-
-        # Layout for the viewer
-        layout = QVBoxLayout()
-
-        # Independent text browser for displaying document content
-        content_display = QTextBrowser(self)
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content_display.setText(file.read())
-        except Exception as e:
-            content_display.setText(f"Could not open file: {str(e)}")
-
-        layout.addWidget(content_display)
-        self.setLayout(layout)
+from Document_Viewer import PagedDocumentViewer as DocumentViewer
+from TF_IDF_Engine import load_documents, TfIdfEngine
 
 # GUI Application
 class DocumentRankingApp(QMainWindow):
@@ -125,8 +35,9 @@ class DocumentRankingApp(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-        # Load documents
+        # Load documents and build the TF-IDF index
         self.documents = load_documents('data')
+        self.engine = TfIdfEngine(self.documents)
 
     def handle_anchor_clicked(self, url):
         """Intercept anchor clicks and open the document viewer."""
@@ -161,7 +72,7 @@ class DocumentRankingApp(QMainWindow):
         QApplication.processEvents()  # Update UI
 
         start_time = time.time()
-        results = search(query, self.documents)
+        results = self.engine.search(query)
         elapsed_time = time.time() - start_time
 
         # Handle results
@@ -202,7 +113,8 @@ class DocumentRankingApp(QMainWindow):
         return f"rgb({red},{green},0)"
 
 # Run Application
-app = QApplication([])
-window = DocumentRankingApp()
-window.show()
-app.exec_()
+if __name__ == "__main__":
+    app = QApplication([])
+    window = DocumentRankingApp()
+    window.show()
+    app.exec_()
@@ -0,0 +1,25 @@
+import math
+from Binary_Independence_Model import BinaryIndependenceModel
+
+POSTINGS = {'a': {'d1', 'd2'}, 'b': {'d2', 'd3'}, 'c': {'d4'}}
+
+def test_scores_sum_rsj_weights_of_matched_terms():
+    bim = BinaryIndependenceModel(POSTINGS, 5)
+    results = dict(bim.retrieve(['a', 'b', 'missing']))
+    weight = math.log((5 - 2 + 0.5) / (2 + 0.5))
+    assert set(results) == {'d1', 'd2', 'd3'}
+    assert math.isclose(results['d2'], 2 * weight)
+    assert math.isclose(results['d1'], weight)
+    assert bim.retrieve(['missing']) == []
+
+def test_relevance_feedback_reestimates_weights():
+    bim = BinaryIndependenceModel(POSTINGS, 5)
+    # d3 is judged relevant: 'b' gains weight and 'a', in no relevant document, turns negative
+    results = bim.retrieve(['a', 'b'], relevant_docs={'d3', 'unknown'})
+    assert [doc for doc, _ in results] == ['d3', 'd2', 'd1']
+    # Only indexed documents count towards R
+    assert math.isclose(bim.query_weights(['b'], {'d3', 'unknown'})['b'], bim.rsj_weight(2, 1, 1))
+
+def test_feedback_outside_the_index_is_ignored():
+    bim = BinaryIndependenceModel(POSTINGS, 5)
+    assert bim.retrieve(['a'], {'x', 'y'}) == bim.retrieve(['a'])
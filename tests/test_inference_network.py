@@ -0,0 +1,40 @@
+import pytest
+from Retrieval_Service import tokenize
+from Inference_Network import InferenceNetwork
+
+@pytest.fixture
+def network():
+    documents = {
+        'a.txt': "the cat sat on the mat",
+        'b.txt': "a dog and a bird",
+        'c.txt': "cat and dog"
+    }
+    return InferenceNetwork(documents, tokenize)
+
+def test_wsum_decimal_weights(network):
+    assert network.parse("#wsum(0.5 cat 1.5 dog)") == ('#wsum', [('term', 'cat'), ('term', 'dog')], [0.5, 1.5])
+    assert network.parse("#wsum(2 cat .25 #or(dog bird))") == (
+        '#wsum', [('term', 'cat'), ('#or', [('term', 'dog'), ('term', 'bird')], [1.0, 1.0])], [2.0, 0.25])
+
+def test_wsum_weights_change_ranking(network):
+    cat_heavy = dict(network.rank("#wsum(0.9 cat 0.1 dog)"))
+    dog_heavy = dict(network.rank("#wsum(0.1 cat 0.9 dog)"))
+    assert cat_heavy['a.txt'] > cat_heavy['b.txt']
+    assert dog_heavy['b.txt'] > dog_heavy['a.txt']
+
+@pytest.mark.parametrize("query", ["#wsum(#or(cat dog) bird)", "#wsum(cat 1 dog)", "#wsum(1 cat 2)", "#syn(cat dog)", "#od(cat dog)"])
+def test_malformed_queries(network, query):
+    with pytest.raises(ValueError):
+        network.parse(query)
+
+def test_not_ranks_documents_without_the_term(network):
+    results = network.rank("#not(cat)")
+    assert [doc for doc, _ in results][0] == 'b.txt'
+    assert results[0][1] == pytest.approx(1 - network.DEFAULT_BELIEF)
+    assert {doc for doc, _ in results} == {'a.txt', 'b.txt', 'c.txt'}
+    either = dict(network.rank("#or(bird #not(cat))"))
+    assert either['b.txt'] > either['c.txt']
+
+def test_split_words_become_and(network):
+    assert network.parse("u.s.") == ('#and', [('term', 'u'), ('term', 's')], [1.0, 1.0])
+    assert network.parse("#or(cat u.s.)")[1][1][0] == '#and'
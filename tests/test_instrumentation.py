@@ -0,0 +1,20 @@
+from Instrumentation import Metrics
+
+def test_drain_and_merge_move_metrics_between_registries():
+    worker = Metrics()
+    worker.counter('slow_operations', stage='query').inc(2)
+    worker.histogram('stage_seconds', stage='score').observe(0.003)
+    worker.histogram('stage_seconds', stage='score').observe(20.0)
+
+    parent = Metrics()
+    parent.histogram('stage_seconds', stage='score').observe(0.003)
+    parent.merge(worker.drain())
+    assert worker.to_dict() == {'counters': [], 'histograms': []}
+
+    data = parent.to_dict()
+    assert data['counters'] == [{'name': 'slow_operations', 'labels': {'stage': 'query'}, 'value': 2}]
+    histogram = data['histograms'][0]
+    assert histogram['count'] == 3
+    assert histogram['buckets']['0.005'] == 2
+    assert histogram['buckets']['+Inf'] == 3
+    assert 'ir_stage_seconds_count{stage="score"} 3' in parent.to_prometheus()
@@ -0,0 +1,26 @@
+import numpy as np
+from Link_Analysis import build_adjacency, pagerank, hits
+
+def test_adjacency_includes_unique_term_links():
+    link_index = {
+        'documents': ['a.txt', 'b.txt', 'c.txt'],
+        'links': {0: {'cat': 1, 'dog': 1}, 1: {'cat': 0, 'dog': 0}},
+        'unique_terms': {'bird': 2},
+        'unique_links': {0: {2: 1}, 1: {2: 3}}
+    }
+    indptr, indices, data = build_adjacency(link_index)
+    dense = np.zeros((3, 3))
+    for row in range(3):
+        dense[row, indices[indptr[row]:indptr[row + 1]]] = data[indptr[row]:indptr[row + 1]]
+    assert dense.tolist() == [[0, 2, 1], [2, 0, 3], [0, 0, 0]]
+    rank = pagerank(indptr, indices, data)
+    assert abs(rank.sum() - 1) < 1e-9
+    assert rank[2] > rank[0]
+
+def test_hits_warm_start_without_linked_hubs():
+    # Only document 2 links out, but the previous hub scores put all weight on document 0
+    indptr, indices, data = np.array([0, 0, 0, 1]), np.array([0], dtype=np.int32), np.array([1.0])
+    with np.errstate(all='raise'):
+        authority, hub = hits(indptr, indices, data, start=np.array([1.0, 0.0, 0.0]))
+    assert np.isfinite(authority).all() and np.isfinite(hub).all()
+    assert authority.argmax() == 0 and hub.argmax() == 2
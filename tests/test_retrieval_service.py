@@ -0,0 +1,106 @@
+import time
+import threading
+import pytest
+import Retrieval_Service
+from Retrieval_Service import RetrievalService, register_model
+
+@pytest.fixture
+def models(monkeypatch):
+    """Replace the model registry with fast, slow-to-rank and slow-to-build test models."""
+    monkeypatch.setattr(Retrieval_Service, 'MODELS', {})
+    release = threading.Event()
+
+    @register_model("Fast")
+    class FastModel:
+        def __init__(self, corpus):
+            pass
+
+        def retrieve(self, query):
+            return [('a.txt', 1.0), ('b.txt', 0.5)]
+
+    @register_model("Slow")
+    class SlowModel:
+        def __init__(self, corpus):
+            pass
+
+        def retrieve(self, query):
+            release.wait(5)
+            return [('c.txt', 1.0)]
+
+    @register_model("Other")
+    class OtherModel:
+        def __init__(self, corpus):
+            pass
+
+        def retrieve(self, query):
+            time.sleep(0.01)
+            return [('c.txt', 1.0), ('d.txt', 0.5)]
+
+    @register_model("Broken")
+    class BrokenModel:
+        def __init__(self, corpus):
+            pass
+
+        def retrieve(self, query):
+            raise ValueError("cannot parse query")
+
+    @register_model("Slow Build")
+    class SlowBuildModel:
+        def __init__(self, corpus):
+            release.wait(5)
+
+        def retrieve(self, query):
+            return [('d.txt', 1.0)]
+
+    yield
+    release.set()
+
+def test_slow_build_does_not_block_built_models(models, tmp_path):
+    service = RetrievalService(str(tmp_path))
+    service.model("Fast")
+    fused, timings, skipped, errors = service.fuse("query", ["Slow Build", "Fast"], time_budget=0.5)
+    assert [doc for doc, _ in fused] == ['a.txt', 'b.txt']
+    assert list(timings) == ["Fast"]
+    assert skipped == ["Slow Build"]
+
+def test_back_to_back_fusions_with_slow_model(models, tmp_path):
+    service = RetrievalService(str(tmp_path))
+    for _ in range(len(Retrieval_Service.MODELS) + 1):
+        start = time.perf_counter()
+        fused, timings, skipped, errors = service.fuse("query", ["Slow", "Fast"], time_budget=0.3)
+        assert time.perf_counter() - start < 1.0
+        assert [doc for doc, _ in fused] == ['a.txt', 'b.txt']
+        assert list(timings) == ["Fast"]
+        assert skipped == ["Slow"]
+
+def test_fusion_order_and_errors(models, tmp_path):
+    service = RetrievalService(str(tmp_path))
+    for names in (["Other", "Broken", "Fast"], ["Fast", "Broken", "Other"]):
+        fused, timings, skipped, errors = service.fuse("query", names, time_budget=2.0)
+        # Tied documents keep the order of the models in names
+        first = 'c.txt' if names[0] == "Other" else 'a.txt'
+        assert fused[0][0] == first
+        assert list(timings) == [name for name in names if name != "Broken"]
+        assert skipped == []
+        assert list(errors) == ["Broken"] and isinstance(errors["Broken"], ValueError)
+
+def test_link_prior_reranks(models, tmp_path):
+    import numpy as np
+    from Link_Analysis import LinkPriors
+    priors = LinkPriors({'documents': ['a.txt', 'b.txt'], 'pagerank': np.array([0.1, 0.9])})
+    service = RetrievalService(str(tmp_path), link_priors=priors)
+    assert [doc for doc, _ in service.retrieve("Fast", "query")] == ['a.txt', 'b.txt']
+    service.prior_weight = 0.6
+    assert [doc for doc, _ in service.retrieve("Fast", "query")] == ['b.txt', 'a.txt']
+
+def test_structural_models_build_only_their_indexes(tmp_path):
+    (tmp_path / 'a.txt').write_text("Machine learning and data")
+    (tmp_path / 'b.txt').write_text("the data of the network")
+    service = RetrievalService(str(tmp_path))
+    results = service.retrieve("Binary Independence Model", "machine learning network")
+    assert {doc for doc, _ in results} == {str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt')}
+    engine = service.corpus.structural_engine
+    assert 'machine learning' in engine.term_ids and 'the' not in engine.term_ids
+    built = set(vars(engine))
+    assert {'postings', 'bim'} <= built
+    assert not {'minhash_index', 'proximity_graph', 'region_index'} & built
@@ -0,0 +1,33 @@
+import math
+from array import array
+from Set_Theoretic_Engine import GeneralizedVectorIndex
+
+def test_gvsm_document_norms_match_dense_projection():
+    # Documents 0 and 2 share a term pattern; document 3 has no terms
+    doc_weights = [{'a': 0.6, 'b': 0.8}, {'b': 1.0}, {'a': 0.3, 'b': 0.4}, {}, {'a': 0.5, 'c': 0.5}]
+    postings = {}
+    for doc_id, weights in enumerate(doc_weights):
+        for term, weight in weights.items():
+            ids, values = postings.setdefault(term, (array('i'), array('d')))
+            ids.append(doc_id)
+            values.append(weight)
+    index = GeneralizedVectorIndex(postings, len(doc_weights))
+
+    # Dense k_i vectors over the minterms, then |sum_i w(i, j) * k_i|
+    k = {}
+    for term, (ids, values) in postings.items():
+        factors = [0.0] * index.num_minterms
+        for doc_id, weight in zip(ids, values):
+            factors[index.doc_minterm[doc_id]] += weight
+        norm = math.sqrt(sum(value ** 2 for value in factors))
+        k[term] = [value / norm for value in factors]
+    for doc_id, weights in enumerate(doc_weights):
+        projected = [sum(weight * k[term][m] for term, weight in weights.items()) for m in range(index.num_minterms)]
+        assert math.isclose(index.doc_norms[doc_id], math.sqrt(sum(value ** 2 for value in projected)), abs_tol=1e-12)
+
+def test_gvsm_correlation_cache_is_bounded():
+    postings = {term: (array('i', [0]), array('d', [1.0])) for term in 'abc'}
+    index = GeneralizedVectorIndex(postings, 1, cache_size=2)
+    for term in 'abc':
+        index.correlation(term)
+    assert index.correlation.cache_info().currsize == 2